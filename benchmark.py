@@ -0,0 +1,222 @@
+#Benchmark -- synthetic defs files through Translator.translate
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import itertools
+import tracemalloc
+import yaml
+
+from main import Translator
+
+'''
+Generates synthetic defs files that exercise every rule of the translator (ranges, comma lists,
+multibraces with operations, $number placeholders and ${} macros), translates them with each
+engine mode and reports the throughput, per-phase wall time and peak memory as JSON.
+
+Example:
+    python benchmark.py --groups 10 100 --labels 4 --width 16 64 --modes default stream jobs
+'''
+
+# Translator configurations that can be compared, each one maps to the constructor and translate arguments
+MODES = {
+    'default':     ({}, {}),
+    'python-yaml': ({'yaml_backend': 'python'}, {}),
+    'c-dump':      ({'dump_backend': 'c'}, {}),
+    'stream':      ({}, {'stream': True}),
+    'jobs':        ({}, {'jobs': os.cpu_count() or 1}),
+    'product':     ({'expansion_mode': 'product'}, {}),
+    'compact':     ({'compact': True}, {}),
+    'plan':        ({}, {'plan': True}),
+}
+
+OPERATIONS = ['+', '-', '*', '/', '<<', '>>', '&', '|', '%', '^']
+MNEMONICS = ['lw', 'sw', 'csrrw', 'csrrs', 'csrrc', 'addi', 'xori']
+
+
+def generate_line(rand, width, features):
+    """
+    Generate a random coverpoint definition.
+
+    Args:
+        rand (random.Random): The random generator.
+        width (int): Number of values of every range.
+        features (list): The rules to use, any of 'range', 'multi', 'comma', 'number' and 'macro'.
+
+    Returns:
+        str: The coverpoint definition.
+    """
+    parts = []
+    braces = 0
+    brace_features = [feature for feature in features if feature != 'number'] or ['range']
+    for index in range(rand.randint(1, 3)):
+        feature = rand.choice(brace_features)
+        if feature == 'range':
+            start = rand.randint(0, 15)
+            parts.append(f'pmpcfg{{{start} ... {start + width - 1}}}')
+            braces += 1
+        elif feature == 'multi':
+            parts.append(f'pmpaddr{{{{0 ... {width - 1}}} {rand.choice(OPERATIONS)} {rand.randint(1, 4)}}}')
+            braces += 2
+        elif feature == 'comma':
+            values = rand.sample(MNEMONICS, rand.randint(2, len(MNEMONICS)))
+            parts.append('{' + ', '.join(values) + '}')
+            braces += 1
+        elif feature == 'macro':
+            parts.append(f'${{MACRO{rand.randint(0, 9)}}}')
+        if index:
+            parts[-1] = f' & {parts[-1]}'
+    line = '(' + ''.join(parts) + ' == 0x80)'
+    if 'number' in features and braces:
+        line += f' and (old("pmpaddr${rand.randint(1, braces)}") ^ pmpaddr$1 == 0x00)'
+    return line
+
+
+def generate_defs(groups, labels, lines, width, features, seed=0):
+    """
+    Generate a synthetic defs document.
+
+    Args:
+        groups (int): Number of coverage groups.
+        labels (int): Number of coverpoint labels per group.
+        lines (int): Number of coverpoint definitions per label.
+        width (int): Number of values of every range.
+        features (list): The rules used by the definitions.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        dict: The defs document.
+    """
+    rand = random.Random(seed)
+    defs = {}
+    for group in range(groups):
+        data = {'config': ['check ISA:=regex(.*32.*); check ISA:=regex(.*I.*Zicsr.*);']}
+        for label in range(labels):
+            data[f'label{label}'] = {generate_line(rand, width, features): 0 for _ in range(lines)}
+        defs[f'group{group}'] = data
+    return defs
+
+
+def run_translation(defs_path, cgf_path, mode):
+    """
+    Translate a defs file phase by phase.
+
+    Args:
+        defs_path (str): Path to the defs file.
+        cgf_path (str): Path to save the CGF file.
+        mode (str): The engine mode, a key of MODES.
+
+    Returns:
+        tuple: The number of coverpoints and a dictionary with the wall time of every phase.
+    """
+    options, translate_options = MODES[mode]
+    trans = Translator(**options)
+    phases = {}
+
+    start = time.perf_counter()
+    if translate_options.get('plan'):
+        # The first run builds the artifact, the following ones load it
+        trans.load_planned(defs_path, cgf_path + '.plan')
+    else:
+        trans.load_yaml(defs_path)
+    phases['load'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if options.get('compact'):
+        count = trans.dump_stream(cgf_path, trans.evaluate_compact(translate_options.get('jobs', 1)).groups(trans.sorted_keys))
+        phases['evaluate_dump'] = time.perf_counter() - start
+    elif translate_options.get('stream'):
+        count = trans.dump_stream(cgf_path, trans.evaluate_stream(translate_options.get('jobs', 1)))
+        phases['evaluate_dump'] = time.perf_counter() - start
+    else:
+        trans.evaluate_cp(translate_options.get('jobs', 1))
+        phases['evaluate'] = time.perf_counter() - start
+        count = trans.count_coverpoints(trans.data_yaml)
+
+        start = time.perf_counter()
+        trans.dump_data(cgf_path, trans.data_yaml)
+        phases['dump'] = time.perf_counter() - start
+
+    return count, phases
+
+
+def benchmark(defs_path, cgf_path, mode, repeat):
+    """
+    Benchmark the translation of a defs file with one engine mode.
+
+    The timings are the best of repeat runs, the peak memory is measured in a separate traced run
+    so that tracemalloc does not distort them.
+
+    Args:
+        defs_path (str): Path to the defs file.
+        cgf_path (str): Path to save the CGF file.
+        mode (str): The engine mode, a key of MODES.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        dict: The benchmark result.
+    """
+    best = None
+    for _ in range(repeat):
+        count, phases = run_translation(defs_path, cgf_path, mode)
+        if best is None or sum(phases.values()) < sum(best.values()):
+            best = phases
+
+    tracemalloc.start()
+    run_translation(defs_path, cgf_path, mode)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total = sum(best.values())
+    return {
+        'mode': mode,
+        'coverpoints': count,
+        'seconds': total,
+        'coverpoints_per_second': count / total if total else None,
+        'phases': best,
+        'peak_memory_bytes': peak,
+        'output_bytes': os.path.getsize(cgf_path),
+    }
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark the translator on synthetic defs files.")
+    parser.add_argument('--groups', type=int, nargs='+', default=[10, 100], help="Numbers of coverage groups.")
+    parser.add_argument('--labels', type=int, nargs='+', default=[4], help="Numbers of labels per group.")
+    parser.add_argument('--lines', type=int, nargs='+', default=[4], help="Numbers of definitions per label.")
+    parser.add_argument('--width', type=int, nargs='+', default=[16, 64], help="Numbers of values per range.")
+    parser.add_argument('--features', nargs='+', default=['range', 'multi', 'comma', 'number', 'macro'],
+                        choices=['range', 'multi', 'comma', 'number', 'macro'], help="Rules used by the definitions.")
+    parser.add_argument('--modes', nargs='+', default=['default'], choices=sorted(MODES), help="Engine modes to compare.")
+    parser.add_argument('--repeat', type=int, default=3, help="Number of timed runs, the best one is reported.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the defs generator.")
+    parser.add_argument('--output', help="Path to save the JSON report, printed to stdout by default.")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        defs_path = os.path.join(work_dir, 'bench.defs')
+        cgf_path = os.path.join(work_dir, 'bench.cgf')
+        for groups, labels, lines, width in itertools.product(args.groups, args.labels, args.lines, args.width):
+            defs = generate_defs(groups, labels, lines, width, args.features, args.seed)
+            with open(defs_path, 'w') as file:
+                yaml.safe_dump(defs, file)
+            scenario = {'groups': groups, 'labels': labels, 'lines': lines, 'width': width,
+                        'features': args.features, 'defs_bytes': os.path.getsize(defs_path)}
+            for mode in args.modes:
+                results.append({'scenario': scenario, **benchmark(defs_path, cgf_path, mode, args.repeat)})
+
+    report = json.dumps({'python': sys.version.split()[0], 'results': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
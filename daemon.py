@@ -0,0 +1,374 @@
+#Daemon -- a resident translator that regenerates CGF files when their defs change
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import selectors
+from collections import OrderedDict
+
+from main import Translator, expand_inputs, add_translator_arguments, translator_from_args
+
+'''
+Keeps a single Translator, its compiled patterns and the parsed defs of every file in memory.
+Watched files are polled for changes of their modification time, only the coverage groups whose
+definitions changed are expanded again and the CGF file is rewritten.
+
+Build scripts can also send translate requests over a Unix socket, one JSON object per line:
+    {"input": "config.defs", "output": "output.cgf"}
+is answered with
+    {"coverpoints": 24, "groups": 1, "seconds": 0.001}
+or {"error": "..."} if the translation failed. {"command": "stop"} shuts the daemon down.
+Requests are answered between two polls, so an idle client connection never delays the polling.
+Only the last --max-requested states of files that are requested but not watched are kept.
+
+Example:
+    python daemon.py config.defs -o output.cgf --socket /tmp/translator.sock
+'''
+
+
+# Longest request line accepted from a client, a longer one closes the connection
+MAX_REQUEST_SIZE = 1024 * 1024
+# Seconds a response may take to be sent before the client is dropped
+SEND_TIMEOUT = 5.0
+
+
+class TranslationState:
+    """The defs and the translated groups of a file as of its last translation."""
+
+    def __init__(self, input_path, output_path):
+        """Initialize the TranslationState object.
+
+        Args:
+            input_path (str): Path to the defs file.
+            output_path (str): Path to save the CGF file.
+        """
+        self.input_path = input_path
+        self.output_path = output_path
+        self.signature = None
+        self.defs_data = {}
+        self.data_yaml = {}
+
+
+class TranslatorDaemon:
+    """Translate defs files on change or on request, reusing everything that did not change."""
+
+    def __init__(self, translator=None, interval=0.5, jobs=1, max_requested=8):
+        """Initialize the TranslatorDaemon object.
+
+        Args:
+            translator (Translator): The translator used for every file, a default one is created if None.
+            interval (float): Seconds between two polls of the watched files.
+            jobs (int): Number of worker processes used to expand the changed coverage groups.
+            max_requested (int): Number of translation states kept for files that are requested over the
+                socket but not watched, the least recently requested ones are evicted first.
+        """
+        if interval <= 0:
+            raise ValueError(f"Invalid interval {interval}: Expected a positive number of seconds.")
+        if max_requested < 0:
+            raise ValueError(f"Invalid max_requested {max_requested}: Expected a non-negative number of states.")
+        self.translator = translator if translator is not None else Translator()
+        self.interval = interval
+        self.jobs = jobs
+        self.max_requested = max_requested
+        self.states = OrderedDict()
+        self.watched = []
+        self.running = False
+
+    def state(self, input_path, output_path):
+        """Return the translation state of a pair of files, creating it on first use."""
+        key = (os.path.abspath(input_path), os.path.abspath(output_path))
+        state = self.states.get(key)
+        if state is None:
+            state = self.states[key] = TranslationState(input_path, output_path)
+        self.states.move_to_end(key)
+        return state
+
+    def evict(self):
+        """Drop the least recently requested states of the files that are not watched, beyond max_requested."""
+        requested = [key for key, state in self.states.items() if state not in self.watched]
+        for key in requested[:max(0, len(requested) - self.max_requested)]:
+            del self.states[key]
+
+    def watch(self, input_path, output_path):
+        """
+        Add a defs file to the files polled for changes.
+
+        Args:
+            input_path (str): Path to the defs file.
+            output_path (str): Path to save the CGF file.
+        """
+        state = self.state(input_path, output_path)
+        if state not in self.watched:
+            self.watched.append(state)
+
+    def signature(self, path):
+        """Return the modification time and size of a file, or None if it does not exist."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def poll(self):
+        """
+        Translate the watched files that changed since their last translation.
+
+        Returns:
+            list: A tuple (input_path, result) for every file that was translated, see refresh.
+        """
+        results = []
+        for state in self.watched:
+            signature = self.signature(state.input_path)
+            if signature is None or signature == state.signature:
+                continue
+            results.append((state.input_path, self.refresh(state, signature)))
+            # A file that failed is not translated again until it changes
+            state.signature = signature
+        return results
+
+    def refresh(self, state, signature=None):
+        """
+        Translate a file again, expanding only the coverage groups whose definitions changed.
+
+        The state is left untouched if the file cannot be loaded or translated, so the next
+        successful translation is still compared against the last good one.
+
+        Args:
+            state (TranslationState): The file to translate.
+            signature (tuple): The signature of the file, read again if None.
+
+        Returns:
+            dict: The number of coverpoints written, the number of groups expanded and the
+                seconds taken, or the error message under 'error'.
+        """
+        start = time.perf_counter()
+        signature = signature if signature is not None else self.signature(state.input_path)
+        trans = self.translator
+        # Duplicates are looked up once the unchanged groups are merged back
+        dedupe, trans.dedupe = trans.dedupe, None
+        try:
+            trans.load_yaml(state.input_path)
+            defs_data = trans.defs_data
+            if not isinstance(defs_data, dict):
+                raise ValueError(f"{state.input_path} does not contain coverage groups.")
+
+            changed = [curr_cov for curr_cov in defs_data
+                       if curr_cov not in state.defs_data or state.defs_data[curr_cov] != defs_data[curr_cov]]
+            trans.defs_data = {curr_cov: defs_data[curr_cov] for curr_cov in changed}
+            trans.evaluate_cp(self.jobs)
+            data_yaml = {curr_cov: trans.data_yaml[curr_cov] if curr_cov in trans.data_yaml
+                         else state.data_yaml[curr_cov] for curr_cov in defs_data}
+        except Exception as e:
+            return {'error': f"{type(e).__name__}: {e}"}
+        finally:
+            trans.dedupe = dedupe
+            trans.defs_data = None
+            trans.data_yaml = None
+
+        state.signature = signature
+        state.defs_data = defs_data
+        state.data_yaml = data_yaml
+        if dedupe is not None:
+            data_yaml = trans.dedupe_data(data_yaml)
+        trans.dump_data(state.output_path, data_yaml)
+        return {
+            'coverpoints': trans.count_coverpoints(data_yaml),
+            'groups': len(changed),
+            'seconds': time.perf_counter() - start,
+        }
+
+    def handle_request(self, request):
+        """
+        Answer a request received over the socket.
+
+        Args:
+            request (dict): Either {"input": ..., "output": ...} or {"command": "stop"}.
+
+        Returns:
+            dict: The response sent back to the client.
+        """
+        if request.get('command') == 'stop':
+            self.running = False
+            return {'stopped': True}
+        if 'input' not in request or 'output' not in request:
+            return {'error': "Expected the input and output paths of the translation."}
+        state = self.state(request['input'], request['output'])
+        try:
+            return self.refresh(state)
+        finally:
+            self.evict()
+
+    def serve_client(self, connection, buffer):
+        """
+        Answer the complete requests a client has sent so far, one JSON object per line.
+
+        Only the data already received is read, so a client that keeps its connection open without
+        sending anything does not hold up the daemon.
+
+        Args:
+            connection (socket.socket): The client connection, readable without blocking.
+            buffer (bytearray): The incomplete request line received so far from this client.
+
+        Returns:
+            bool: False if the connection must be closed: the client closed it, sent a request longer
+                than MAX_REQUEST_SIZE, or stopped the daemon.
+        """
+        data = connection.recv(65536)
+        if not data:
+            return False
+        buffer += data
+        while True:
+            end = buffer.find(b'\n')
+            if end < 0:
+                return len(buffer) <= MAX_REQUEST_SIZE
+            line = bytes(buffer[:end])
+            del buffer[:end + 1]
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                response = self.handle_request(request) if isinstance(request, dict) \
+                    else {'error': "Expected a JSON object."}
+            except ValueError as e:
+                response = {'error': f"Invalid request: {e}"}
+            connection.sendall((json.dumps(response) + '\n').encode('utf-8'))
+            if not self.running:
+                return False
+
+    def run(self, socket_path=None):
+        """
+        Translate the watched files, then poll them for changes until stopped.
+
+        The watched files are polled every interval seconds, client requests are answered as they
+        arrive in between.
+
+        Args:
+            socket_path (str): Path of the Unix socket to serve translate requests on, if any.
+        """
+        server = None
+        selector = selectors.DefaultSelector()
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(socket_path)
+            server.listen()
+            server.setblocking(False)
+            selector.register(server, selectors.EVENT_READ)
+
+        self.running = True
+        next_poll = time.monotonic()
+        try:
+            while self.running:
+                if time.monotonic() >= next_poll:
+                    for input_path, result in self.poll():
+                        report(input_path, result)
+                    next_poll = time.monotonic() + self.interval
+                timeout = max(0.0, next_poll - time.monotonic())
+                if server is None:
+                    time.sleep(timeout)
+                    continue
+                for key, _ in selector.select(timeout):
+                    if key.fileobj is server:
+                        try:
+                            connection, _ = server.accept()
+                        except BlockingIOError:
+                            continue
+                        connection.settimeout(SEND_TIMEOUT)
+                        selector.register(connection, selectors.EVENT_READ, bytearray())
+                        continue
+                    try:
+                        keep = self.serve_client(key.fileobj, key.data)
+                    except OSError as e:
+                        print(f"Failed to answer request: {e}")
+                        keep = False
+                    if not keep:
+                        selector.unregister(key.fileobj)
+                        key.fileobj.close()
+                    if not self.running:
+                        break
+        finally:
+            self.running = False
+            for key in list(selector.get_map().values()):
+                key.fileobj.close()
+            selector.close()
+            if server is not None:
+                os.remove(socket_path)
+
+
+def report(input_path, result):
+    """Print the outcome of a translation."""
+    if 'error' in result:
+        print(f"{input_path}: {result['error']}")
+    else:
+        print(f"{input_path}: {result['coverpoints']} coverpoints, "
+              f"{result['groups']} groups expanded in {result['seconds']:.3f} seconds")
+    sys.stdout.flush()
+
+
+def send_request(socket_path, request):
+    """
+    Send a request to a running daemon and wait for the response.
+
+    Args:
+        socket_path (str): Path of the Unix socket of the daemon.
+        request (dict): The request, see TranslatorDaemon.handle_request.
+
+    Returns:
+        dict: The response of the daemon.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        with client.makefile('rw', encoding='utf-8') as stream:
+            stream.write(json.dumps(request) + '\n')
+            stream.flush()
+            return json.loads(stream.readline())
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Keep a translator resident and regenerate CGF files on change.")
+    parser.add_argument('inputs', nargs='*',
+                        help="Defs files or glob patterns to watch, @FILE reads a manifest with one entry per line.")
+    parser.add_argument('-o', '--output', help="Path to save the CGF file of a single watched input.")
+    parser.add_argument('-d', '--output-dir', help="Directory where <name>.cgf is written for every watched input.")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="Number of worker processes used to expand the changed coverage groups.")
+    parser.add_argument('--interval', type=float, default=0.5, help="Seconds between two polls of the watched files.")
+    parser.add_argument('--socket', help="Path of a Unix socket to serve translate requests on.")
+    parser.add_argument('--max-requested', type=int, default=8,
+                        help="Number of files requested over the socket but not watched whose state is kept.")
+    add_translator_arguments(parser)
+    args = parser.parse_args(argv)
+
+    inputs = expand_inputs(args.inputs) if args.inputs else []
+    if not inputs and not args.socket:
+        parser.error("Nothing to do: give files to watch or a --socket to serve.")
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+        outputs = [os.path.join(args.output_dir, os.path.splitext(os.path.basename(path))[0] + '.cgf')
+                   for path in inputs]
+        if len(set(outputs)) != len(outputs):
+            parser.error("Several inputs map to the same file in the output directory.")
+    elif len(inputs) == 1 and args.output:
+        outputs = [args.output]
+    elif inputs:
+        parser.error("-o/--output is required for a single input, --output-dir for several inputs.")
+    else:
+        outputs = []
+
+    trans = translator_from_args(args)
+    daemon = TranslatorDaemon(trans, args.interval, args.jobs, args.max_requested)
+    for input_path, output_path in zip(inputs, outputs):
+        daemon.watch(input_path, output_path)
+    try:
+        daemon.run(args.socket)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
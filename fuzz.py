@@ -0,0 +1,467 @@
+#Fuzz -- differential testing of translator engines against the original Translator
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import importlib
+import itertools
+import yaml
+
+import reference
+from main import Translator, ExpansionCache, LAZY_MIN_SIZE, OPERATIONS as OPERATION_FUNCTIONS
+
+'''
+Generates random defs lines covering every rule of the translator (ranges, comma lists,
+multibraces with operations over ranges and lists, $number placeholders and ${} macros),
+translates them with the reference and with every engine under test, and checks that the CGF
+files are identical. The reference is the original str.replace/eval Translator, frozen in
+reference.py, so the compiled plans, the tokenizer, the lazy ranges and the caches of main.py
+are all checked against an engine that has none of them. A mismatch is shrunk to a minimal failing line before it
+is reported, together with the speed of every engine relative to the reference.
+
+Engines are Translator configurations from ENGINES, or any Translator compatible class given
+as module:Class. The original translator only advances the braces of a line together, the product
+engine is checked against ProductReference instead, which expands them like nested loops.
+
+Example:
+    python fuzz.py --cases 500 --engines stream jobs no-fragment-cache mypackage.engine:FastTranslator
+'''
+
+# Lines expanding to more coverpoints in product mode fail with a ValueError in the engine and its reference
+PRODUCT_LIMIT = 4096
+
+# Engines that must produce the same CGF as the reference, each one maps to the constructor and translate arguments
+ENGINES = {
+    'default':           ({}, {}),
+    'python-yaml':       ({'yaml_backend': 'python'}, {}),
+    'c-dump':            ({'dump_backend': 'c'}, {}),
+    'stream':            ({}, {'stream': True}),
+    'stream-input':      ({}, {'stream_input': True}),
+    'jobs':              ({}, {'jobs': 2}),
+    'no-fragment-cache': ({'fragment_cache_size': 0}, {}),
+    'dedupe-report':     ({'dedupe': 'report'}, {}),
+    'cache':             ({'cache': 'temporary'}, {}),
+    'compact':           ({'compact': True}, {}),
+    'compact-jobs':      ({'compact': True}, {'jobs': 2}),
+    'plan':              ({}, {'plan_path': 'temporary'}),
+    'product':           ({'expansion_mode': 'product', 'max_coverpoints': PRODUCT_LIMIT}, {}),
+}
+
+# Engines checked against another reference than the original translator
+ENGINE_REFERENCES = {
+    'product': 'fuzz:ProductReference',
+}
+
+OPERATIONS = ['+', '-', '*', '/', '<<', '>>', '&', '|', '%', '^']
+# The operations the original translator evaluates, the others are only checked with another --reference
+REFERENCE_OPERATIONS = ['+', '-', '*', '/', '<<', '>>']
+WORDS = ['lw', 'sw', 'csrrw', 'csrrs', '0x80', 'rs1_val == 0x0', '${MACRO}']
+LITERALS = ['pmpcfg', 'pmpaddr', ' & ', ' == 0x80', ' and ', '(old("pmpaddr', '")', ' ^ ', '>>8', '']
+# Keys over 128 characters are written as ? key / : value pairs, whose folding differs between emitters
+LONG_LITERAL = (' and mode == "M" and rs1_val == 0x0 and rs2_val == 0xffffffff and imm_val == 0x7ff'
+                ' and (old("pmpcfg0") & 0x80 == 0x00) and (pmpaddr0 ^ old("pmpaddr0") == 0x0) ')
+
+# Share of the braces drawn with a wide width, from WIDE_MIN_WIDTH, often above LAZY_MIN_SIZE
+WIDE_RATE = 0.05
+WIDE_MIN_WIDTH = 256
+
+# Pieces a line is shrunk by: braces, macros, placeholders and the literal text between them
+PIECE_FINDER = re.compile(r'\{\s*\{[^{}]*\}[^{}]*\}|\{[^{}]*\}|\$\{[^}]*\}|\$\d+|[^{$]+|.')
+RANGE_FINDER = re.compile(r'\{(\d+) \.\.\. (\d+)\}')
+# Pieces of a line expanded by ProductReference
+PRODUCT_FINDER = re.compile(
+    r'(?P<macro>\$\{[^}]*\})'
+    r'|\{\{(?P<multi>[^{}]*)\} (?P<operation>\S+) (?P<digit>\d+)\}'
+    r'|(?P<brace>\{(?:\$\{[^}]*\}|[^{}])*\})'
+    r'|\$(?P<number>\d+)'
+)
+
+# The original translator, every engine is checked against it
+REFERENCE = 'reference:Translator'
+
+
+def generate_width(rand, width, wide_width):
+    """
+    Draw the number of extra values of a range or list.
+
+    Args:
+        rand (random.Random): The random generator.
+        width (int): Maximum width of the ordinary braces.
+        wide_width (int): Maximum width of the wide braces drawn at WIDE_RATE, 0 for none.
+
+    Returns:
+        int: The width.
+    """
+    if wide_width and rand.random() < WIDE_RATE:
+        return rand.randint(WIDE_MIN_WIDTH, max(wide_width, WIDE_MIN_WIDTH))
+    return rand.randint(0, width)
+
+
+def generate_line(rand, operations=REFERENCE_OPERATIONS, width=20, wide_width=2 * LAZY_MIN_SIZE, length=4):
+    """
+    Generate a random valid coverpoint definition.
+
+    Args:
+        rand (random.Random): The random generator.
+        operations (list): The operations of the multibraces.
+        width (int): Maximum width of the ordinary ranges and lists.
+        wide_width (int): Maximum width of the wide ranges and lists, 0 for none.
+        length (int): Maximum number of literal and brace pairs, a literal is sometimes long enough for
+            the key to exceed 128 characters.
+
+    Returns:
+        str: The coverpoint definition.
+    """
+    parts = []
+    braces = 0
+    written = []
+    for _ in range(rand.randint(1, length)):
+        parts.append(LONG_LITERAL if rand.random() < 0.1 else rand.choice(LITERALS))
+        rule = rand.choice(['range', 'comma', 'multi', 'multi-list', 'number', 'macro', 'repeat'])
+        if rule == 'repeat' and written:
+            # A brace written again is a loop of its own in product mode
+            text, count = rand.choice(written)
+            parts.append(text)
+            braces += count
+            continue
+        if rule == 'range':
+            start = rand.randint(0, 31)
+            written.append((f'{{{start} ... {start + generate_width(rand, width, wide_width)}}}', 1))
+        elif rule == 'comma':
+            written.append(('{' + ', '.join(rand.sample(WORDS, rand.randint(1, 4))) + '}', 1))
+        elif rule == 'multi':
+            start = rand.randint(0, 31)
+            stop = start + generate_width(rand, width, wide_width)
+            written.append((f'{{{{{start} ... {stop}}} {rand.choice(operations)} {rand.randint(1, 8)}}}', 2))
+        elif rule == 'multi-list':
+            count = 3 + generate_width(rand, 2, wide_width)
+            values = ', '.join(str(rand.randint(0, 255)) for _ in range(count))
+            written.append((f'{{{{{values}}} {rand.choice(operations)} {rand.randint(1, 8)}}}', 2))
+        elif rule == 'number' and braces:
+            parts.append(f'${rand.randint(1, braces)}')
+            continue
+        else:
+            parts.append(f'${{MACRO{rand.randint(0, 3)}}}')
+            continue
+        parts.append(written[-1][0])
+        braces += written[-1][1]
+    return ''.join(parts).strip() or 'plain'
+
+
+def generate_defs(rand, groups, labels, lines, operations=REFERENCE_OPERATIONS, width=20,
+                  wide_width=2 * LAZY_MIN_SIZE, length=4):
+    """
+    Generate a random defs document.
+
+    Args:
+        rand (random.Random): The random generator.
+        groups (int): Maximum number of coverage groups.
+        labels (int): Maximum number of labels per group.
+        lines (int): Maximum number of coverpoint definitions per label.
+        operations (list): The operations of the multibraces.
+        width (int): Maximum width of the ordinary ranges and lists.
+        wide_width (int): Maximum width of the wide ranges and lists, 0 for none.
+        length (int): Maximum number of literal and brace pairs per line.
+
+    Returns:
+        dict: The defs document.
+    """
+    defs = {}
+    for group in range(rand.randint(1, groups)):
+        data = {'config': ['check ISA:=regex(.*32.*);']}
+        for label in range(rand.randint(1, labels)):
+            data[f'label{label}'] = {generate_line(rand, operations, width, wide_width, length): 0 for _ in range(rand.randint(1, lines))}
+        defs[f'group{group}'] = data
+    return defs
+
+
+def expand_product(instr):
+    """
+    Expand a line written by generate_line like nested loops, without the tokenizer of main.py.
+
+    Every brace is a loop of its own, even when it repeats an earlier brace, and the internal brace of a
+    multibrace loops with it. $number takes the value of the brace it refers to, counting the braces in
+    order of first appearance with the repeats of a brace right after it.
+
+    Args:
+        instr (str): The line.
+
+    Raises:
+        IndexError: If a $number placeholder does not refer to a brace.
+        ValueError: If the line expands to more than PRODUCT_LIMIT coverpoints.
+
+    Returns:
+        list: The coverpoints, the last loop varying fastest.
+    """
+    pieces = []
+    loops = []
+    numbering = {}
+    position = 0
+    for match in PRODUCT_FINDER.finditer(instr):
+        pieces.append(instr[position:match.start()])
+        position = match.end()
+        if match.group('macro'):
+            pieces.append(match.group(0))
+        elif match.group('number'):
+            pieces.append(int(match.group('number')))
+        elif match.group('multi') is not None:
+            internal = [int(value) for value in brace_values(match.group('multi'))]
+            function, digit = OPERATION_FUNCTIONS[match.group('operation')], int(match.group('digit'))
+            loops.append(([str(function(value, digit)) for value in internal], [str(value) for value in internal]))
+            numbering[('multi', len(loops))] = [(len(loops) - 1, 1), (len(loops) - 1, 0)]
+            pieces.append((len(loops) - 1, 0))
+        else:
+            loops.append(([str(value) for value in brace_values(match.group('brace')[1:-1])], None))
+            numbering.setdefault(match.group('brace'), []).append((len(loops) - 1, 0))
+            pieces.append((len(loops) - 1, 0))
+    pieces.append(instr[position:])
+
+    order = [reference for references in numbering.values() for reference in references]
+    pieces = [order[piece - 1] if isinstance(piece, int) else piece for piece in pieces]
+    count = 1
+    for values, _ in loops:
+        count *= len(values)
+    if count > PRODUCT_LIMIT:
+        raise ValueError(f"{instr} expands to {count} coverpoints, above the limit of {PRODUCT_LIMIT}.")
+
+    coverpoints = []
+    for indexes in itertools.product(*(range(len(values)) for values, _ in loops)):
+        coverpoints.append(''.join(piece if isinstance(piece, str) else loops[piece[0]][piece[1]][indexes[piece[0]]]
+                                   for piece in pieces))
+    return coverpoints
+
+
+def brace_values(content):
+    """Return the values of a brace written by generate_line, without its curly brackets."""
+    if '...' in content:
+        start, end = content.split('...')
+        return list(range(int(start), int(end) + 1))
+    return [value.strip() for value in content.split(',')]
+
+
+class ProductReference(reference.Translator):
+    """The original translator expanding the braces of every line like nested loops, the reference of the product engine."""
+
+    def finder(self, curr_cov, label):
+        """
+        Expand the lines of a label with expand_product.
+
+        Args:
+            curr_cov (str): The current coverpoint.
+            label (str): The label within the coverpoint.
+        """
+        line = self.defs_data[curr_cov][label]
+        if not isinstance(line, dict):
+            self.generator(curr_cov, label, line, 0)
+            return
+        for instr in line:
+            for coverpoint in expand_product(instr):
+                self.generator(curr_cov, label, coverpoint, 1)
+
+
+def load_engine(name):
+    """
+    Build the factory of an engine.
+
+    Args:
+        name (str): A key of ENGINES, or module:Class naming a Translator compatible class.
+
+    Raises:
+        ValueError: If the engine is unknown.
+
+    Returns:
+        tuple: A tuple (factory, translate_options) where factory builds the translator given a work directory.
+    """
+    if name in ENGINES:
+        options, translate_options = ENGINES[name]
+
+        def factory(work_dir):
+            arguments = dict(options)
+            if arguments.get('cache') == 'temporary':
+                arguments['cache'] = ExpansionCache(os.path.join(work_dir, 'cache'))
+            return Translator(**arguments)
+        return factory, translate_options
+
+    module_name, _, class_name = name.partition(':')
+    if not class_name:
+        raise ValueError(f"Unknown engine {name}: Expected one of {', '.join(ENGINES)} or module:Class.")
+    engine_class = getattr(importlib.import_module(module_name), class_name)
+    return lambda work_dir: engine_class(), {}
+
+
+def run_engine(engine, defs, work_dir):
+    """
+    Translate defs with an engine.
+
+    Args:
+        engine (tuple): The engine returned by load_engine.
+        defs (dict): The defs document.
+        work_dir (str): Directory for the defs, CGF, cache and plan files.
+
+    Returns:
+        tuple: The CGF text, or the name of the exception raised, and the seconds taken by translate.
+    """
+    factory, translate_options = engine
+    translate_options = dict(translate_options)
+    if translate_options.get('plan_path') == 'temporary':
+        translate_options['plan_path'] = os.path.join(work_dir, 'fuzz.plan')
+    defs_path = os.path.join(work_dir, 'fuzz.defs')
+    cgf_path = os.path.join(work_dir, 'fuzz.cgf')
+    with open(defs_path, 'w') as file:
+        yaml.safe_dump(defs, file)
+    if os.path.exists(cgf_path):
+        os.remove(cgf_path)
+
+    trans = factory(work_dir)
+    start = time.perf_counter()
+    try:
+        trans.translate(defs_path, cgf_path, **translate_options)
+    except Exception as e:
+        return f"error: {type(e).__name__}", time.perf_counter() - start
+    elapsed = time.perf_counter() - start
+    with open(cgf_path, 'r') as file:
+        return file.read(), elapsed
+
+
+def mismatch(engine, defs, reference, work_dir):
+    """Tell whether an engine translates defs differently from the reference."""
+    return run_engine(engine, defs, work_dir)[0] != run_engine(reference, defs, work_dir)[0]
+
+
+def shrink(engine, defs, reference, work_dir):
+    """
+    Reduce a failing defs document to a minimal failing one.
+
+    The document is first reduced to a single failing line when there is one, then pieces of the line
+    are removed and ranges narrowed for as long as the engines still disagree.
+
+    Args:
+        engine (tuple): The engine under test.
+        defs (dict): The failing defs document.
+        reference (tuple): The reference engine.
+        work_dir (str): Directory for the temporary files.
+
+    Returns:
+        dict: The minimal failing defs document.
+    """
+    def single(line):
+        return {'group0': {'config': ['check ISA:=regex(.*32.*);'], 'label0': {line: 0}}}
+
+    lines = [line for group in defs.values() for value in group.values() if isinstance(value, dict) for line in value]
+    failing = [line for line in lines if mismatch(engine, single(line), reference, work_dir)]
+    if not failing:
+        return defs
+
+    line = min(failing, key=len)
+    changed = True
+    while changed:
+        changed = False
+        pieces = PIECE_FINDER.findall(line)
+        candidates = [''.join(pieces[:index] + pieces[index + 1:]) for index in range(len(pieces))]
+        candidates += [line[:match.start()] + f'{{{match.group(1)} ... {int(match.group(1)) + 1}}}' + line[match.end():]
+                       for match in RANGE_FINDER.finditer(line) if int(match.group(2)) > int(match.group(1)) + 1]
+        for candidate in candidates:
+            if candidate.strip() and mismatch(engine, single(candidate), reference, work_dir):
+                line, changed = candidate, True
+                break
+    return single(line)
+
+
+def fuzz(engine_names, cases, seed, groups, labels, lines, work_dir, reference_name=REFERENCE,
+         operations=REFERENCE_OPERATIONS, width=20, wide_width=2 * LAZY_MIN_SIZE, length=4):
+    """
+    Run the differential fuzz campaign.
+
+    Args:
+        engine_names (list): The engines under test.
+        cases (int): Number of random defs documents.
+        seed (int): Seed of the random generator.
+        groups (int): Maximum number of coverage groups per document.
+        labels (int): Maximum number of labels per group.
+        lines (int): Maximum number of coverpoint definitions per label.
+        work_dir (str): Directory for the temporary files.
+        reference_name (str): The reference engine, a key of ENGINES or module:Class. The engines of
+            ENGINE_REFERENCES are checked against their own reference.
+        operations (list): The operations of the multibraces.
+        width (int): Maximum width of the ordinary ranges and lists.
+        wide_width (int): Maximum width of the wide ranges and lists, 0 for none.
+        length (int): Maximum number of literal and brace pairs per line.
+
+    Returns:
+        dict: The report of every engine.
+    """
+    rand = random.Random(seed)
+    engines = {name: load_engine(name) for name in engine_names}
+    reference_names = {name: ENGINE_REFERENCES.get(name, reference_name) for name in engine_names}
+    references = {name: load_engine(name) for name in set(reference_names.values())}
+    results = {name: {'reference': reference_names[name], 'cases': 0, 'mismatches': 0, 'seconds': 0.0,
+                      'reference_seconds': 0.0, 'failures': []}
+               for name in engine_names}
+
+    for _ in range(cases):
+        defs = generate_defs(rand, groups, labels, lines, operations, width, wide_width, length)
+        expectations = {name: run_engine(reference, defs, work_dir) for name, reference in references.items()}
+        for name, engine in engines.items():
+            reference = references[reference_names[name]]
+            expected, reference_seconds = expectations[reference_names[name]]
+            actual, seconds = run_engine(engine, defs, work_dir)
+            result = results[name]
+            result['cases'] += 1
+            result['seconds'] += seconds
+            result['reference_seconds'] += reference_seconds
+            if actual != expected:
+                result['mismatches'] += 1
+                minimal = shrink(engine, defs, reference, work_dir)
+                result['failures'].append({
+                    'defs': minimal,
+                    'reference': run_engine(reference, minimal, work_dir)[0],
+                    'engine': run_engine(engine, minimal, work_dir)[0],
+                })
+
+    for result in results.values():
+        result['speed_ratio'] = result['reference_seconds'] / result['seconds'] if result['seconds'] else None
+    return results
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Check translator engines against the original Translator.")
+    parser.add_argument('--engines', nargs='+', default=sorted(ENGINES),
+                        help="Engines under test: names from ENGINES or module:Class.")
+    parser.add_argument('--cases', type=int, default=200, help="Number of random defs documents.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the defs generator.")
+    parser.add_argument('--groups', type=int, default=3, help="Maximum number of coverage groups per document.")
+    parser.add_argument('--labels', type=int, default=3, help="Maximum number of labels per group.")
+    parser.add_argument('--lines', type=int, default=4, help="Maximum number of definitions per label.")
+    parser.add_argument('--width', type=int, default=20, help="Maximum width of the ordinary ranges and lists.")
+    parser.add_argument('--wide-width', type=int, default=2 * LAZY_MIN_SIZE,
+                        help="Maximum width of the wide ranges and lists, which cross the lazy range "
+                             "threshold, 0 for none.")
+    parser.add_argument('--length', type=int, default=4, help="Maximum number of literal and brace pairs per line.")
+    parser.add_argument('--reference', default=REFERENCE,
+                        help="Engine the others are checked against: a name from ENGINES or module:Class.")
+    parser.add_argument('--operations', nargs='+', choices=OPERATIONS, default=REFERENCE_OPERATIONS,
+                        help="Operations of the multibraces, &, |, %% and ^ need a --reference that supports them.")
+    parser.add_argument('--output', help="Path to save the JSON report, printed to stdout by default.")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = fuzz(args.engines, args.cases, args.seed, args.groups, args.labels, args.lines, work_dir,
+                       args.reference, args.operations, args.width, args.wide_width, args.length)
+
+    report = json.dumps({'python': sys.version.split()[0], 'seed': args.seed, 'reference': args.reference,
+                         'engines': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(report + '\n')
+    else:
+        print(report)
+    return 1 if any(result['mismatches'] for result in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,118 +1,1980 @@
 #Translator -- defs(cgf/yaml based file --> cgf)
 import os
 import re
+import ast
+import sys
+import asyncio
+import inspect
+import threading
+import functools
+import contextlib
+import glob
+import fnmatch
+import json
 import math
+import time
+import cProfile
+import itertools
+import pickle
+import heapq
+import hashlib
+import argparse
+import operator
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 import yaml
+
 '''
 *********************************************RULES****************************************************
 
-1. {start_digit ... end_digit}:
-   - Anything within curly brackets containing numbers separated by three dots will be considered a range.
-   - The range will generate coverpoints from start_digit to end_digit, inclusive.
-   - Example: pmpcfg{0 ... 10} will generate coverpoints from pmpcfg0 to pmpcfg10.
+1. {start_digit ... end_digit}:
+   - Anything within curly brackets containing numbers separated by three dots will be considered a range.
+   - The range will generate coverpoints from start_digit to end_digit, inclusive.
+   - Example: pmpcfg{0 ... 10} will generate coverpoints from pmpcfg0 to pmpcfg10.
+
+2. ${} Macro Usage:
+   - Use ${} to reference macros defined in macros.yaml.
+   - They are not dealt in this script, will be resolved in the RISC-V ISAC
+   - Macros are constants or predefined coverpoint values.
+   - Example: ${MACRO_NAME}
+
+3. $number Placeholder:
+   - Use $number to refer to values from curly brackets in the same line.
+   - Each $number corresponds to a value in the curly brackets in order of appearance.
+   - Example: (pmpcfg{0 ... 10} >> 8) and (pmpcfg$1 == 0x80)
+
+4. {value1, value2, ...} Loop:
+   - Lists enclosed in curly brackets will generate coverpoints by iterating through values.
+   - Each value will be used as a coverpoint.
+   - Example: "{lw, sw, csrrw}": 0 will generate coverpoints for lw, sw, and csrrw.
+
+5. {{val1, val2, end_val} <operation> <digit>} Enumeration with Operation:
+   - Use double curly brackets with an operation to enumerate values.
+   - Values will be enumerated based on the specified operation and digit.
+   - Example: {{0, 8, 16, 24} >> 4} will enumerate values {0, 0, 1, 1}.
+   - Supported operations: +, -, *, /, <<, >>, &, |, %, ^. Division results are floored.
+
+6. {{val1 ... end_val} <operation> <digit>} Advanced Range Enumeration:
+   - Advanced version of point 1 allowing repeated values in the range.
+   - Each value in the range will be repeated based on the specified operation and digit.
+   - Example: {{0 ... 3} * 4} will generate {0, 4, 8, 12}.
+
+Several braces with more than one value in the same line advance together by default (lockstep),
+the shorter ones wrapping around until the longest one is exhausted. Translator(expansion_mode='product')
+expands them like nested loops instead, generating every combination of their values. Every brace is a
+loop of its own there, even when it repeats another brace of the line, only $number reuses a brace.
+
+Translator(fold_constants=True) evaluates the integer-only subexpressions of every generated coverpoint,
+e.g. (0xFF<<8) becomes (0xff00), and the ${} macros given a value in its macro table.
+
+****************************************************************************************************
+'''
+
+# Operations allowed in {{...} <operation> <digit>} braces. '/' floors the result like math.floor(x / digit)
+OPERATIONS = {
+    '+':  operator.add,
+    '-':  operator.sub,
+    '*':  operator.mul,
+    '/':  operator.floordiv,
+    '<<': operator.lshift,
+    '>>': operator.rshift,
+    '&':  operator.and_,
+    '|':  operator.or_,
+    '%':  operator.mod,
+    '^':  operator.xor,
+}
+
+# Bump whenever a change to the translator alters the generated coverpoints, this invalidates the caches
+TRANSLATOR_VERSION = '3'
+
+# Bump whenever the layout of the plan artifacts written by Translator.save_plan changes
+PLAN_FORMAT = 2
+
+# Operations folded into literals by Translator.fold. '/' and '**' are left to ISAC, as they
+# produce floats or may not terminate
+FOLD_OPERATIONS = {
+    ast.Add:      operator.add,
+    ast.Sub:      operator.sub,
+    ast.Mult:     operator.mul,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod:      operator.mod,
+    ast.LShift:   operator.lshift,
+    ast.RShift:   operator.rshift,
+    ast.BitAnd:   operator.and_,
+    ast.BitOr:    operator.or_,
+    ast.BitXor:   operator.xor,
+}
+FOLD_UNARY_OPERATIONS = {
+    ast.UAdd:   operator.pos,
+    ast.USub:   operator.neg,
+    ast.Invert: operator.invert,
+}
+# Folded values are kept within this magnitude, larger constants are left as written
+FOLD_LIMIT = 2 ** 128
+
+# Kinds of the tokens returned by Translator.tokenize. The value of a brace token is a tuple (slot, parsed)
+# where the slot is a tuple (kind, index) naming the brace in the replacement dictionary
+LITERAL = 'literal'   # Text copied as is
+MACRO   = 'macro'     # A ${variable} macro, copied as is as it is resolved in the RISC-V ISAC
+RANGE   = 'range'     # A {0 ... 3} brace, parsed into a range or a list of integers
+LIST    = 'list'      # A {lw, sw} brace, parsed into the list of its values
+MULTI   = 'multi'     # A {{0 ... 3} >> 1} brace, parsed into (internal values, values, operation, digit)
+INNER   = 'inner'     # The slot of the internal brace of a multibrace, only referred to by $number
+NUMBER  = 'number'    # A $number placeholder, the value is the number
+
+if getattr(yaml, '__with_libyaml__', False):
+    class CGroupLoader(yaml.cyaml.CParser, yaml.composer.Composer, yaml.constructor.SafeConstructor, yaml.resolver.Resolver):
+        """The libyaml parser with the Python composer, which can compose the top-level nodes one at a time."""
+
+        def __init__(self, stream):
+            yaml.cyaml.CParser.__init__(self, stream)
+            yaml.composer.Composer.__init__(self)
+            yaml.constructor.SafeConstructor.__init__(self)
+            yaml.resolver.Resolver.__init__(self)
+else:
+    CGroupLoader = None
+
+# Largest slot whose values are converted to text up front, wider ones are converted when generated
+LAZY_MIN_SIZE = 1024
+
+
+class LazyRange:
+    """A range with an operation applied to its values, each value is computed when it is indexed."""
+
+    __slots__ = ('values', 'function', 'digit', 'text')
+
+    def __init__(self, values, operation=None, digit=0, text=False):
+        """Initialize the LazyRange object.
+
+        Args:
+            values (range): The values the operation is applied to.
+            operation (str): The operation, one of the keys of OPERATIONS, or None to keep the values.
+            digit (int): The operand of the operation.
+            text (bool): Return the values as strings.
+
+        Raises:
+            ValueError: If the operation is invalid.
+        """
+        self.values = values
+        self.function = None
+        self.digit = int(digit)
+        self.text = text
+        if operation is not None:
+            self.function = OPERATIONS.get(operation)
+            if self.function is None:
+                raise ValueError(f"Invalid operation {operation}.")
+            # Evaluating the bounds raises on invalid operands such as a division by zero, like apply_operation
+            if values:
+                self.function(values[0], self.digit)
+                self.function(values[-1], self.digit)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        value = self.values[index]
+        if self.function is not None:
+            value = self.function(value, self.digit)
+        return str(value) if self.text else value
+
+    def __iter__(self):
+        for index in range(len(self.values)):
+            yield self[index]
+
+    def as_text(self):
+        """Return the same range with its values returned as strings."""
+        copy = LazyRange(self.values, text=True)
+        copy.function, copy.digit = self.function, self.digit
+        return copy
+
+
+class ExpansionCache:
+    """An on-disk cache of expanded coverage groups with size-based least recently used eviction."""
+
+    def __init__(self, cache_dir, max_size=256 * 1024 * 1024):
+        """Initialize the ExpansionCache object.
+
+        Args:
+            cache_dir (str): Directory holding the cache entries, created if missing.
+            max_size (int): Maximum total size of the entries in bytes.
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.size = sum(entry.stat().st_size for entry in self.entries())
+        # The directory may have been filled under a larger limit
+        if self.size > self.max_size:
+            self.evict()
+
+    def entries(self):
+        """Return the cache entries found in the cache directory."""
+        return [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith('.pkl')]
+
+    def path(self, key):
+        """Return the path of the entry stored under the given key."""
+        return os.path.join(self.cache_dir, f'{key}.pkl')
+
+    def __contains__(self, key):
+        return os.path.exists(self.path(key))
+
+    def get(self, key):
+        """
+        Load the entry stored under the given key.
+
+        Args:
+            key (str): The key of the entry.
+
+        Returns:
+            object: The cached data, or None if the key is not cached.
+        """
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as file:
+                data = pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            with self.lock:
+                self.misses += 1
+            return None
+        # Refresh the modification time, eviction removes the least recently used entries first
+        try:
+            os.utime(path)
+        except OSError:
+            pass  # Evicted by another translation in the meantime
+        with self.lock:
+            self.hits += 1
+        return data
+
+    def put(self, key, data):
+        """
+        Store an entry under the given key and evict old entries if the cache is too large.
+
+        Args:
+            key (str): The key of the entry.
+            data (object): The data to store.
+        """
+        path = self.path(key)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'wb') as file:
+            pickle.dump(data, file, protocol=pickle.HIGHEST_PROTOCOL)
+        size = os.path.getsize(temp_path)
+        os.replace(temp_path, path)
+        with self.lock:
+            self.size += size
+            if self.size > self.max_size:
+                self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits in max_size."""
+        entries = sorted(self.entries(), key=lambda entry: entry.stat().st_mtime)
+        self.size = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if self.size <= self.max_size:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+            except OSError:
+                continue
+            self.size -= size
+
+    def stats(self):
+        """
+        Report the cache usage.
+
+        Returns:
+            dict: The hits, misses, number of entries and total size in bytes.
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries()), 'size': self.size}
+
+
+class FragmentCache:
+    """A bounded least recently used cache of parsed braces, shared by every line and thread of a translator."""
+
+    def __init__(self, max_entries=1024):
+        """Initialize the FragmentCache object.
+
+        Args:
+            max_entries (int): Maximum number of parsed braces kept.
+        """
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        """Pickle a snapshot of the cached braces without the lock, other threads may be using the cache."""
+        with self.lock:
+            state = self.__dict__.copy()
+            state['entries'] = self.entries.copy()
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        """Restore a pickled cache with a new lock."""
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Fetch a parsed brace.
+
+        Args:
+            key (tuple): The kind and text of the brace.
+
+        Returns:
+            object: The parsed brace, or None if the brace is not cached.
+        """
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Store a parsed brace, dropping the least recently used one if the cache is full.
+
+        Args:
+            key (tuple): The kind and text of the brace.
+            value (object): The parsed brace, it must not be modified afterwards.
+        """
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        """
+        Report the cache usage.
+
+        Returns:
+            dict: The hits, misses and number of entries.
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries)}
+
+
+class CoverpointStore:
+    """Compact store of expanded coverpoints: interned groups and labels, and the coverpoint text in one buffer."""
+
+    def __init__(self):
+        """Initialize the CoverpointStore object."""
+        self.group_ids = {}
+        self.group_labels = []        # Label ids of every group by label, in order of appearance
+        self.label_names = []
+        self.values = {}              # Values of the labels that are not expanded, by label id
+        self.runs = []                # Coverpoint index ranges [start, end) of every label
+        self.buffer = bytearray()
+        self.offsets = array('Q', [0])
+        self.label_of = array('I')
+        self.hashes = array('I')
+        self.last_label = None
+        self.last_label_id = None
+        self.table = array('i', [-1]) * 1024   # Open-addressing hash index of the coverpoints
+
+    def __len__(self):
+        return len(self.label_of)
+
+    def group_id(self, curr_cov):
+        """Return the id of a coverage group, interning it on first use."""
+        group_id = self.group_ids.get(curr_cov)
+        if group_id is None:
+            group_id = self.group_ids[curr_cov] = len(self.group_labels)
+            self.group_labels.append({})
+        return group_id
+
+    def label_id(self, curr_cov, label):
+        """Return the id of a label, interning the group and label on first use."""
+        labels = self.group_labels[self.group_id(curr_cov)]
+        label_id = labels.get(label)
+        if label_id is None:
+            label_id = labels[label] = len(self.label_names)
+            self.label_names.append(label)
+            self.runs.append([])
+        return label_id
+
+    def add(self, curr_cov, label, coverpoint):
+        """
+        Add a coverpoint to a label, unless the label already holds it.
+
+        Args:
+            curr_cov (str): The coverage group.
+            label (str): The label.
+            coverpoint (str): The coverpoint.
+
+        Returns:
+            bool: True if the coverpoint was added.
+        """
+        if (curr_cov, label) != self.last_label:
+            self.last_label, self.last_label_id = (curr_cov, label), self.label_id(curr_cov, label)
+        label_id = self.last_label_id
+        data = coverpoint.encode('utf-8', 'surrogatepass')
+        digest = (hash(coverpoint) ^ label_id) & 0xFFFFFFFF
+        table, hashes = self.table, self.hashes
+        mask = len(table) - 1
+        slot = digest & mask
+        index = table[slot]
+        while index >= 0:
+            if hashes[index] == digest and self.label_of[index] == label_id \
+                    and self.buffer[self.offsets[index]:self.offsets[index + 1]] == data:
+                return False
+            slot = (slot + 1) & mask
+            index = table[slot]
+
+        index = len(hashes)
+        table[slot] = index
+        hashes.append(digest)
+        self.buffer += data
+        self.offsets.append(len(self.buffer))
+        self.label_of.append(label_id)
+        runs = self.runs[label_id]
+        if runs and runs[-1][1] == index:
+            runs[-1][1] = index + 1
+        else:
+            runs.append([index, index + 1])
+        # Keep the table at most two thirds full
+        if 3 * len(self.label_of) > 2 * len(self.table):
+            self.rehash()
+        return True
+
+    def rehash(self):
+        """Double the size of the hash index."""
+        self.table = array('i', [-1]) * (2 * len(self.table))
+        mask = len(self.table) - 1
+        for index, digest in enumerate(self.hashes):
+            slot = digest & mask
+            while self.table[slot] >= 0:
+                slot = (slot + 1) & mask
+            self.table[slot] = index
+
+    def set_value(self, curr_cov, label, value):
+        """Set the value of a label that is not expanded, such as config."""
+        self.values[self.label_id(curr_cov, label)] = value
+
+    def update(self, curr_cov, labels):
+        """
+        Add the labels of a coverage group expanded elsewhere, such as in a worker process or the cache.
+
+        Args:
+            curr_cov (str): The coverage group.
+            labels (dict): The expanded labels.
+        """
+        self.group_id(curr_cov)
+        for label, value in labels.items():
+            if isinstance(value, dict):
+                for coverpoint in value:
+                    self.add(curr_cov, label, coverpoint)
+            else:
+                self.set_value(curr_cov, label, value)
+
+    def label_value(self, label_id):
+        """Build the value of a label in the shape of the translated data."""
+        if label_id in self.values:
+            return self.values[label_id]
+        buffer, offsets = self.buffer, self.offsets
+        return {buffer[offsets[index]:offsets[index + 1]].decode('utf-8', 'surrogatepass'): 0
+                for start, end in self.runs[label_id] for index in range(start, end)}
+
+    def labels(self, curr_cov, sort_keys):
+        """
+        Iterate over the labels of a coverage group, each value is built when it is reached.
+
+        Args:
+            curr_cov (str): The coverage group.
+            sort_keys (callable): Function returning the keys of a mapping in the order they are yielded.
+
+        Yields:
+            tuple: A tuple (label, value) for every label.
+        """
+        labels = self.group_labels[self.group_ids[curr_cov]]
+        for label in sort_keys(labels):
+            yield label, self.label_value(labels[label])
+
+    def groups(self, sort_keys):
+        """
+        Iterate over the coverage groups in the shape expected by Translator.dump_stream.
+
+        Args:
+            sort_keys (callable): Function returning the keys of a mapping in the order they are yielded.
+
+        Yields:
+            tuple: A tuple (curr_cov, labels) where labels is a generator of (label, value) tuples.
+        """
+        for curr_cov in sort_keys(self.group_ids):
+            yield curr_cov, self.labels(curr_cov, sort_keys)
+
+    def to_dict(self):
+        """Convert the store into translated data, in the order the groups and labels were added."""
+        return {curr_cov: {label: self.label_value(label_id) for label, label_id in self.group_labels[group_id].items()}
+                for curr_cov, group_id in self.group_ids.items()}
+
+
+class Selector:
+    """Patterns selecting the coverage groups and labels to expand."""
+
+    def __init__(self, groups=None, labels=None):
+        """Initialize the Selector object.
+
+        A pattern is a glob, e.g. pmp_*, or a regular expression after a re: prefix, e.g. re:pmp_cfg_(locked|unlocked).*
+        A name is selected if it matches any of the patterns, or if no pattern is given.
+
+        Args:
+            groups (list): Patterns of the coverage groups to expand.
+            labels (list): Patterns of the labels to expand in the selected groups. Labels that are not
+                expanded, such as config, are always kept.
+
+        Raises:
+            ValueError: If a regular expression is invalid.
+        """
+        self.groups = [self.compile(pattern) for pattern in groups or []]
+        self.labels = [self.compile(pattern) for pattern in labels or []]
+
+    def compile(self, pattern):
+        """Return a function telling whether a name matches the pattern."""
+        if pattern.startswith('re:'):
+            try:
+                return re.compile(pattern[3:]).fullmatch
+            except re.error as e:
+                raise ValueError(f"Invalid regular expression {pattern[3:]}: {e}")
+        return lambda name: fnmatch.fnmatchcase(name, pattern)
+
+    def match_group(self, curr_cov):
+        """Tell whether a coverage group is selected."""
+        return not self.groups or any(match(str(curr_cov)) for match in self.groups)
+
+    def match_label(self, label):
+        """Tell whether a label is selected."""
+        return not self.labels or any(match(str(label)) for match in self.labels)
+
+    def select(self, defs_data):
+        """
+        Keep the selected coverage groups and labels of defs data.
+
+        Args:
+            defs_data (dict): The defs data.
+
+        Returns:
+            dict: The selected defs data, in the same order.
+        """
+        selected = {}
+        for curr_cov, group in defs_data.items():
+            if not self.match_group(curr_cov):
+                continue
+            if isinstance(group, dict):
+                group = {label: value for label, value in group.items()
+                         if not isinstance(value, dict) or self.match_label(label)}
+            selected[curr_cov] = group
+        return selected
+
+
+class DedupIndex:
+    """
+    Index of the canonical forms of the coverpoints seen across every label and group of a document.
+
+    Only a digest of every canonical form is kept, with the interned group and label of its first
+    occurrence and its position in that label. The full text is recorded for the duplicates only.
+    """
+
+    def __init__(self, canonical, mode='report'):
+        """Initialize the DedupIndex object.
+
+        Args:
+            canonical (callable): Function returning the canonical form of a coverpoint.
+            mode (str): 'report' to only record the duplicates, 'drop' to remove them as well.
+
+        Raises:
+            ValueError: If the mode is unknown.
+        """
+        if mode not in ('report', 'drop'):
+            raise ValueError(f"Unknown dedupe mode {mode}: Expected 'report' or 'drop'.")
+        self.canonical = canonical
+        self.mode = mode
+        self.seen = {}
+        self.group_ids = {}
+        self.groups = []
+        self.label_ids = {}
+        self.labels = []
+        self.duplicates = []
+        self.total = 0
+
+    @staticmethod
+    def intern(ids, names, name):
+        """Return the ID of a group or label name, assigning the next one on first use."""
+        name_id = ids.get(name)
+        if name_id is None:
+            name_id = ids[name] = len(names)
+            names.append(name)
+        return name_id
+
+    def filter(self, curr_cov, label, coverpoints):
+        """
+        Look up the coverpoints of a label, the first occurrence of a canonical form is kept.
+
+        Args:
+            curr_cov (str): The coverage group of the label.
+            label (str): The label.
+            coverpoints (dict): The coverpoints of the label.
+
+        Returns:
+            dict: The coverpoints without the duplicates in 'drop' mode, otherwise the coverpoints unchanged.
+        """
+        kept = {}
+        group_id = self.intern(self.group_ids, self.groups, curr_cov)
+        label_id = self.intern(self.label_ids, self.labels, label)
+        for position, (coverpoint, value) in enumerate(coverpoints.items()):
+            self.total += 1
+            # A digest keeps the index small, the canonical forms can be longer than the coverpoints
+            digest = hashlib.blake2b(self.canonical(coverpoint).encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+            first = self.seen.get(digest)
+            if first is None:
+                self.seen[digest] = (group_id, label_id, position)
+            else:
+                self.duplicates.append(((curr_cov, label, coverpoint), self.locate(first)))
+                if self.mode == 'drop':
+                    continue
+            kept[coverpoint] = value
+        return kept if self.mode == 'drop' else coverpoints
+
+    def locate(self, first):
+        """
+        Resolve the interned IDs of a first occurrence.
+
+        Args:
+            first (tuple): The group ID, label ID and position stored in seen.
+
+        Returns:
+            tuple: The coverage group, the label and the position of the coverpoint in the label.
+        """
+        group_id, label_id, position = first
+        return self.groups[group_id], self.labels[label_id], position
+
+    def stats(self):
+        """
+        Report the duplicates found.
+
+        Returns:
+            dict: The number of coverpoints looked up, of unique coverpoints, of duplicates and of removed duplicates.
+        """
+        return {
+            'coverpoints': self.total,
+            'unique': len(self.seen),
+            'duplicates': len(self.duplicates),
+            'removed': len(self.duplicates) if self.mode == 'drop' else 0,
+        }
+
+
+# Translator methods timed by the PhaseProfiler, in the order finder runs them
+PROFILED_PHASES = (
+    'finder',
+    'tokenize',
+    'resolve_braces',
+    'compile_plan',
+    'calculate_coverpoints',
+    'generator',
+)
+
+
+class PhaseProfiler:
+    """Collects the wall time and call count of every translator phase, per phase, label and key."""
+
+    def __init__(self, cprofile=False):
+        """Initialize the PhaseProfiler object.
+
+        Args:
+            cprofile (bool): Also run translate under cProfile to export pstats compatible statistics.
+        """
+        self.phases = {}
+        self.labels = {}
+        self.keys = {}
+        self.cprofile = cProfile.Profile() if cprofile else None
+
+    def wrap(self, translator, name):
+        """
+        Replace a method of the translator instance with a timed version of it.
+
+        Args:
+            translator (Translator): The translator to instrument.
+            name (str): The name of the method.
+        """
+        function = getattr(translator, name)
+
+        def timed(*args, **kwargs):
+            # finder records the key it is expanding, whether it was tokenized or taken from a plan artifact
+            if name == 'generator' and args[3] == 1:
+                key = (translator.curr_cov, translator.label, translator.instr)
+                self.keys[key] = self.keys.get(key, 0) + 1
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(translator, name, time.perf_counter() - start)
+
+        setattr(translator, name, timed)
+
+    def wrap_translate(self, translator):
+        """
+        Run every translate call of the translator under cProfile.
+
+        Args:
+            translator (Translator): The translator to instrument.
+        """
+        function = translator.translate
+
+        def profiled(*args, **kwargs):
+            self.cprofile.enable()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.cprofile.disable()
+
+        translator.translate = profiled
+
+    def record(self, translator, name, elapsed):
+        """
+        Record one call of a phase.
+
+        Args:
+            translator (Translator): The instrumented translator.
+            name (str): The name of the phase.
+            elapsed (float): The wall time of the call in seconds.
+        """
+        for counters in (self.phases, self.labels.setdefault((translator.curr_cov, translator.label), {})):
+            calls, seconds = counters.get(name, (0, 0.0))
+            counters[name] = (calls + 1, seconds + elapsed)
+
+    def report(self):
+        """
+        Build the profiling report.
+
+        Returns:
+            dict: The phases, labels and keys statistics. Generated coverpoints are counted before
+                duplicates are removed.
+        """
+        def phases(counters):
+            return {name: {'calls': calls, 'seconds': seconds} for name, (calls, seconds) in counters.items()}
+
+        return {
+            'phases': phases(self.phases),
+            'labels': [{'group': group, 'label': label, 'phases': phases(counters)}
+                       for (group, label), counters in self.labels.items()],
+            'keys': [{'group': group, 'label': label, 'key': key, 'coverpoints': count}
+                     for (group, label, key), count in self.keys.items()],
+            'total_coverpoints': sum(self.keys.values()),
+        }
+
+    def dump_json(self, output_path):
+        """
+        Save the profiling report as JSON.
+
+        Args:
+            output_path (str): Path to save the report.
+        """
+        with open(output_path, 'w') as file:
+            json.dump(self.report(), file, indent=2, default=str)
+
+    def dump_stats(self, output_path):
+        """
+        Save the cProfile statistics, readable with pstats or snakeviz.
+
+        Args:
+            output_path (str): Path to save the statistics.
+
+        Raises:
+            ValueError: If the profiler was created without cprofile.
+        """
+        if self.cprofile is None:
+            raise ValueError("cProfile statistics were not collected, enable profiling with cprofile=True.")
+        self.cprofile.dump_stats(output_path)
+
+
+class TranslationContext:
+    """The working state of a single translation: the loaded defs, the generated data and the line being expanded."""
+
+    def __init__(self):
+        """Initialize the TranslationContext object."""
+        self.defs_data = None
+        self.data_yaml = None
+        self.compiled_lines = None
+        self.store = None
+        self.dedupe_index = None
+        self.replacement_dict = {}
+        self.curr_cov = None
+        self.label = None
+        self.instr = None
+
+
+class ContextAttribute:
+    """A Translator attribute kept in the TranslationContext of the calling thread instead of on the instance."""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, translator, owner=None):
+        if translator is None:
+            return self
+        return getattr(translator.context, self.name)
+
+    def __set__(self, translator, value):
+        setattr(translator.context, self.name, value)
+
+
+def contextual(method):
+    """
+    Run a Translator method in a TranslationContext of its own.
+
+    The context is given with the context keyword, a new one is created if it is missing. Generator
+    methods switch to their context every time they are resumed, so they can be interleaved with
+    other calls in the same thread.
+
+    Args:
+        method (callable): The method to wrap.
+
+    Returns:
+        callable: The wrapped method.
+    """
+    if inspect.isgeneratorfunction(method):
+        @functools.wraps(method)
+        def generator(self, *args, context=None, **kwargs):
+            context = context if context is not None else TranslationContext()
+            iterator = method(self, *args, **kwargs)
+            while True:
+                with self.use_context(context):
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                yield item
+        return generator
+
+    @functools.wraps(method)
+    def wrapper(self, *args, context=None, **kwargs):
+        with self.use_context(context):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class Translator:
+    """A class for translating YAML data and generating coverpoints.
+
+    The configuration, the compiled patterns and the caches are shared, while the working state of a
+    translation lives in a TranslationContext per call. A single translator can serve translations
+    from several threads at once, see translate_async.
+    """
+
+    # Working state of the translation running in the calling thread
+    defs_data = ContextAttribute()
+    data_yaml = ContextAttribute()
+    compiled_lines = ContextAttribute()
+    store = ContextAttribute()
+    dedupe_index = ContextAttribute()
+    replacement_dict = ContextAttribute()
+    curr_cov = ContextAttribute()
+    label = ContextAttribute()
+    instr = ContextAttribute()
+
+    def __init__(self, yaml_backend='auto', cache=None, expansion_mode='lockstep', max_coverpoints=None,
+                 on_limit='error', fold_constants=False, macros=None, dedupe=None, fragment_cache_size=1024,
+                 compact=False, dump_backend='python'):
+        """Initialize the Translator object.
+
+        Args:
+            yaml_backend (str): YAML implementation used to load the files: 'c' for libyaml, 'python' for
+                the pure-Python loader or 'auto' to use libyaml whenever PyYAML was built with it.
+            cache (ExpansionCache): Optional cache of expanded coverage groups. Only the groups
+                whose source changed since they were cached are expanded again.
+            expansion_mode (str): 'lockstep' to advance every brace of a line together or
+                'product' to expand them like nested loops.
+            max_coverpoints (int): Maximum number of coverpoints a single line may expand to.
+            on_limit (str): 'error' to raise when a line exceeds max_coverpoints, 'warn' to
+                print a warning and expand it anyway.
+            fold_constants (bool): Evaluate the integer-only subexpressions of every generated
+                coverpoint into literals, see fold.
+            macros (dict): Values of the ${variable} macros that may be folded, by macro name.
+                Only used when fold_constants is set.
+            dedupe (str): Look for coverpoints that are identical up to whitespace and redundant
+                parentheses across the whole document: 'report' to record them in dedupe_index,
+                'drop' to also keep only their first occurrence, in the order of the groups and labels of
+                the CGF file.
+            fragment_cache_size (int): Number of parsed braces kept for the following lines, 0 to
+                resolve every brace again.
+            compact (bool): Keep the coverpoints of a translation in a CoverpointStore instead of nested
+                dictionaries, each label is converted when it is written, see evaluate_compact.
+            dump_backend (str): YAML implementation used to write the output: 'python' for the pure-Python
+                dumper, or 'c' for the much faster libyaml dumper, whose folding of keys longer than 128
+                characters depends on the libyaml version.
+
+        Raises:
+            ValueError: If the expansion mode, the limit action or the dedupe mode is unknown, or if a macro
+                value is not an integer.
+        """
+        if expansion_mode not in ('lockstep', 'product'):
+            raise ValueError(f"Unknown expansion mode {expansion_mode}: Expected 'lockstep' or 'product'.")
+        if on_limit not in ('error', 'warn'):
+            raise ValueError(f"Unknown limit action {on_limit}: Expected 'error' or 'warn'.")
+        if dedupe not in (None, 'report', 'drop'):
+            raise ValueError(f"Unknown dedupe mode {dedupe}: Expected 'report' or 'drop'.")
+        self.cache = cache
+        self.profiler = None
+        self.expansion_mode = expansion_mode
+        self.max_coverpoints = max_coverpoints
+        self.on_limit = on_limit
+        self.fold_constants = fold_constants
+        self.macros = {}
+        for name, value in (macros or {}).items():
+            try:
+                self.macros[str(name)] = value if isinstance(value, int) and not isinstance(value, bool) \
+                    else int(str(value), 0)
+            except ValueError:
+                raise ValueError(f"Invalid value for macro {name}: Expected an integer, got {value!r}.")
+        self.dedupe = dedupe
+        self.fragment_cache = FragmentCache(fragment_cache_size) if fragment_cache_size else None
+        self.compact = compact
+        self.local = threading.local()
+
+        self.braces_finder          = re.compile(r'({.*?})')
+        self.macro_brace_resolver   = re.compile(r'(\%\d+)')   # 
+        self.repeat_brace_index     = re.compile(r'(\*\d+)')
+        self.operation_finder       = re.compile(r'(<<|>>|[+\-*/&|%^])\s*(\d+)')
+        self.digit_finder           = re.compile(r'\d+')
+        self.range_finder           = re.compile(r'{(\d+)\s*\.\.\.\s*(\d+)}')
+        self.comma_number_finder    = re.compile(r'\{\d+(?:, \d+)*\}')
+        self.list_separator         = re.compile(r'\$\{[^}\n]*\}|(,)')    # commas outside of ${variable}
+        self.macro_finder           = re.compile(r'\$\{([^}\n]*)\}')
+
+        # A brace ends at its first closing bracket that is not part of a ${variable}
+        brace_body = r'(?:\$\{[^}\n]*\}|[^}\n])*?\}'
+        self.token_finder = re.compile(
+            r'(?P<macro>\$\{[^}\n]*\})'                        # ${variable}
+            r'|(?P<multi>\{\s*\{' + brace_body + brace_body + ')'  # {{0 ... 3} >> 1}
+            r'|(?P<brace>\{' + brace_body + ')'                  # {0 ... 3} or {lw, sw}
+            r'|(?P<number>\$\d+)'                                # $1
+        )
+
+        self.yaml_loader, self.yaml_dumper = self.select_yaml_backend(yaml_backend, dump_backend)
+
+    def select_yaml_backend(self, yaml_backend, dump_backend='python'):
+        """Select the YAML loader and dumper classes for the requested backends.
+
+        libyaml folds long keys differently from the pure-Python emitter depending on its version, so
+        the output is only written with it on request, the loaders parse the same documents alike.
+
+        Args:
+            yaml_backend (str): Backend of the loader, one of 'auto', 'c' or 'python'.
+            dump_backend (str): Backend of the dumper, 'python' or 'c'.
+
+        Returns:
+            tuple: A tuple containing the loader and dumper classes.
+
+        Raises:
+            ValueError: If a backend is unknown or libyaml is requested but not available.
+        """
+        libyaml = getattr(yaml, '__with_libyaml__', False)
+        if dump_backend not in ('python', 'c'):
+            raise ValueError(f"Unknown YAML dump backend {dump_backend}: Expected 'python' or 'c'.")
+        if 'c' in (yaml_backend, dump_backend) and not libyaml:
+            raise ValueError("PyYAML was built without libyaml, the 'c' backend is not available.")
+        dumper = yaml.CSafeDumper if dump_backend == 'c' else yaml.SafeDumper
+        if yaml_backend == 'c' or (yaml_backend == 'auto' and libyaml):
+            return yaml.CSafeLoader, dumper
+        if yaml_backend in ('auto', 'python'):
+            return yaml.SafeLoader, dumper
+        raise ValueError(f"Unknown YAML backend {yaml_backend}: Expected 'auto', 'c' or 'python'.")
+
+    def __getstate__(self):
+        """Pickle the translator configuration without the loaded or generated data."""
+        state = self.__dict__.copy()
+        # The translation contexts belong to the threads of this process
+        state.pop('local', None)
+        state['cache'] = None
+        # Profiling wrappers are instance attributes and stay in the parent process
+        state['profiler'] = None
+        for name in PROFILED_PHASES + ('translate',):
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        """Restore a pickled translator with no translation running."""
+        self.__dict__.update(state)
+        self.local = threading.local()
+
+    @property
+    def context(self):
+        """TranslationContext: The working state of the translation running in the calling thread.
+
+        A thread that is not running a contextual method works in a default context of its own, so the
+        phases can still be called one by one.
+        """
+        if not hasattr(self.local, 'contexts'):
+            self.local.contexts = [TranslationContext()]
+        return self.local.contexts[-1]
+
+    @contextlib.contextmanager
+    def use_context(self, context=None):
+        """
+        Make a context the working state of the calling thread until the block exits.
+
+        Args:
+            context (TranslationContext): The context to use, a new one if None.
+
+        Yields:
+            TranslationContext: The context in use.
+        """
+        context = context if context is not None else TranslationContext()
+        if not hasattr(self.local, 'contexts'):
+            self.local.contexts = [TranslationContext()]
+        self.local.contexts.append(context)
+        try:
+            yield context
+        finally:
+            self.local.contexts.pop()
+
+    def enable_profiling(self, cprofile=False):
+        """
+        Instrument the phases of the translator with a PhaseProfiler.
+
+        The methods listed in PROFILED_PHASES are replaced by timed wrappers on this instance only,
+        so a translator without profiling runs the plain methods at no cost. Groups expanded in
+        worker processes are not recorded, and the counters are not meant for translations running
+        in several threads at once.
+
+        Args:
+            cprofile (bool): Also run translate under cProfile.
+
+        Returns:
+            PhaseProfiler: The profiler collecting the statistics.
+        """
+        self.disable_profiling()
+        self.profiler = PhaseProfiler(cprofile)
+        for name in PROFILED_PHASES:
+            self.profiler.wrap(self, name)
+        if cprofile:
+            self.profiler.wrap_translate(self)
+        return self.profiler
+
+    def disable_profiling(self):
+        """Remove the profiling wrappers from the translator."""
+        for name in PROFILED_PHASES + ('translate',):
+            self.__dict__.pop(name, None)
+        self.profiler = None
+
+    @contextual
+    def translate(self, input_path, output_path, stream=False, jobs=1, shards=None, shard_level='group',
+                  stream_input=False, selector=None, unselected='skip', patch=False, plan_path=None):
+        """Translate YAML data from the input file and dump it into the output file.
+        
+        Args:
+            input_path (str): Path to the input YAML file.
+            output_path (str): Path to save the translated YAML data.
+            stream (bool): Emit the output one coverage group and label at a time instead of
+                building the whole document in memory first.
+            jobs (int): Number of worker processes used to expand the coverage groups.
+            shards (int): Split the output into this many files balanced by coverpoint count, see dump_shards.
+            shard_level (str): 'group' to keep every coverage group in a single shard, 'label' to
+                distribute the labels of a group over several shards.
+            stream_input (bool): Parse the input one coverage group at a time and write each group
+                as soon as it is expanded, see evaluate_input_stream. Implies stream. Like stream, the output
+                file is only replaced once the whole input is translated.
+            selector (Selector): Expand only the selected coverage groups and labels.
+            unselected (str): 'skip' to leave the groups and labels that are not selected out of the output,
+                'passthrough' to copy them from the input without expanding them.
+            patch (bool): Replace the selected groups and labels in the existing output file, keeping
+                everything else it holds. The selected ones that no longer expand to anything are removed.
+            plan_path (str): Path of a plan artifact of the input, used instead of parsing the input when it
+                is up to date and rebuilt otherwise, see load_planned.
+            context (TranslationContext): The working state of the translation, a new one if None. Pass one
+                to read its dedupe_index once the translation is done.
+
+        Raises:
+            ValueError: If shards is combined with stream, if the shard level is unknown, if stream_input
+                is combined with shards, several jobs or a plan artifact, if passthrough or patch is combined
+                with stream or shards, or if passthrough is combined with patch.
+
+        Returns:
+            int: The number of coverpoints written.
+        """
+        if shards is not None and (stream or stream_input):
+            raise ValueError("Sharding needs the whole document, it cannot be combined with stream.")
+        if unselected not in ('skip', 'passthrough'):
+            raise ValueError(f"Unknown unselected action {unselected}: Expected 'skip' or 'passthrough'.")
+        if (unselected == 'passthrough' or patch) and (stream or stream_input or shards is not None):
+            raise ValueError("Passthrough and patch need the whole document, they cannot be combined with stream or shards.")
+        if unselected == 'passthrough' and patch:
+            raise ValueError("Patch keeps the unselected groups and labels of the output, it cannot be combined with passthrough.")
+        if stream_input:
+            if jobs > 1:
+                raise ValueError("Groups are expanded as they are parsed, stream_input cannot use several jobs.")
+            if plan_path is not None:
+                raise ValueError("Groups are expanded as they are parsed, stream_input cannot use a plan artifact.")
+            return self.dump_stream(output_path, self.evaluate_input_stream(input_path, selector))
+        if plan_path is not None:
+            self.load_planned(input_path, plan_path)
+        else:
+            self.load_yaml(input_path)
+        if patch:
+            self.evaluate_cp(jobs, selector)
+            data_yaml = self.patch_data(output_path, self.data_yaml, selector)
+            self.dump_data(output_path, data_yaml)
+            return self.count_coverpoints(data_yaml)
+        if selector is not None and unselected == 'skip':
+            self.defs_data = selector.select(self.defs_data)
+        elif selector is not None:
+            self.evaluate_cp(jobs, selector, unselected)
+            self.dump_data(output_path, self.data_yaml)
+            return self.count_coverpoints(self.data_yaml)
+        if shards is not None:
+            self.evaluate_cp(jobs)
+            manifest = self.dump_shards(output_path, self.data_yaml, shards, shard_level)
+            return sum(shard['coverpoints'] for shard in manifest['shards'])
+        if stream:
+            return self.dump_stream(output_path, self.evaluate_stream(jobs))
+        if self.compact:
+            store = self.evaluate_compact(jobs)
+            groups = store.groups(self.sorted_keys)
+            if self.dedupe is not None:
+                self.dedupe_index = DedupIndex(self.canonical_coverpoint, self.dedupe)
+                groups = ((curr_cov, self.dedupe_labels(curr_cov, labels)) for curr_cov, labels in groups)
+            return self.dump_stream(output_path, groups)
+        self.evaluate_cp(jobs)
+        self.dump_data(output_path, self.data_yaml)
+        return self.count_coverpoints(self.data_yaml)
+
+    async def translate_async(self, input_path, output_path, executor=None, **options):
+        """Translate in an executor, so that the event loop keeps running during the translation.
+
+        Every call works in a TranslationContext of its own, several translations may run at once
+        on the same translator.
+
+        Args:
+            input_path (str): Path to the input YAML file.
+            output_path (str): Path to save the translated YAML data.
+            executor (concurrent.futures.Executor): The executor running the translation, the default
+                executor of the event loop if None.
+            **options: The keyword arguments of translate.
+
+        Returns:
+            int: The number of coverpoints written.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            executor, functools.partial(self.translate, input_path, output_path, **options))
+
+    @contextual
+    def iter_coverpoints(self, source, jobs=1, unexpanded=False):
+        """Expand coverpoints in memory, without writing or parsing a CGF file.
+
+        The coverage groups are expanded lazily, one at a time, in the order of a CGF file.
+
+        Args:
+            source (str or dict): Path to a defs file, or defs data that is already loaded.
+            jobs (int): Number of worker processes used to expand the coverage groups.
+            unexpanded (bool): Also yield the labels that are not expanded, such as config, once with
+                their value as is. They are skipped by default.
+            context (TranslationContext): The working state of the expansion, a new one if None.
+
+        Yields:
+            tuple: A tuple (curr_cov, label, coverpoint) for every generated coverpoint.
+        """
+        self.load_source(source)
+        for curr_cov, labels in self.evaluate_stream(jobs):
+            for label, value in labels:
+                if isinstance(value, dict):
+                    for coverpoint in value:
+                        yield curr_cov, label, coverpoint
+                elif unexpanded:
+                    yield curr_cov, label, value
+
+    @contextual
+    def to_cgf(self, source, jobs=1):
+        """Translate defs into CGF data in memory, without writing or parsing a CGF file.
+
+        Args:
+            source (str or dict): Path to a defs file, or defs data that is already loaded.
+            jobs (int): Number of worker processes used to expand the coverage groups.
+            context (TranslationContext): The working state of the translation, a new one if None.
+
+        Returns:
+            dict: The CGF data, as it would be written by translate.
+        """
+        self.load_source(source)
+        self.evaluate_cp(jobs)
+        return self.data_yaml
+
+    def load_source(self, source):
+        """Load defs data from a file path or take an already loaded dictionary.
+
+        Args:
+            source (str or dict): Path to a defs file, or defs data that is already loaded.
+
+        Raises:
+            FileNotFoundError: If the specified file is not found.
+        """
+        if isinstance(source, dict):
+            self.defs_data = source
+            self.compiled_lines = None
+        else:
+            self.load_yaml(source)
+
+    def iter_groups(self, input_path):
+        """Parse a defs file one coverage group at a time.
+
+        Only the coverage group being yielded is constructed, nodes with an anchor are the only
+        ones kept from one group to the next.
+
+        Args:
+            input_path (str): Path to the defs file.
+
+        Raises:
+            FileNotFoundError: If the specified file is not found.
+            ValueError: If the file is not a mapping of coverage groups or a coverage group is repeated.
+
+        Yields:
+            tuple: A tuple (curr_cov, group) for every coverage group, in the order of the file.
+        """
+        if not os.path.exists(input_path):
+            raise FileNotFoundError(f"{input_path} does not exist.")
+        loader_class = CGroupLoader if self.yaml_loader is yaml.CSafeLoader else self.yaml_loader
+        with open(input_path, 'r') as file:
+            loader = loader_class(file)
+            try:
+                loader.get_event()  # StreamStartEvent
+                if loader.check_event(yaml.StreamEndEvent):
+                    return
+                loader.get_event()  # DocumentStartEvent
+                if not loader.check_event(yaml.MappingStartEvent):
+                    raise ValueError(f"{input_path} does not contain coverage groups.")
+                loader.get_event()
+                seen = set()
+                while not loader.check_event(yaml.MappingEndEvent):
+                    curr_cov = loader.construct_object(loader.compose_node(None, None), deep=True)
+                    group = loader.construct_object(loader.compose_node(None, None), deep=True)
+                    loader.constructed_objects = {}
+                    if curr_cov in seen:
+                        raise ValueError(f"Coverage group {curr_cov} is repeated in {input_path}.")
+                    seen.add(curr_cov)
+                    yield curr_cov, group
+            finally:
+                loader.dispose()
+
+    def evaluate_input_stream(self, input_path, selector=None):
+        """Evaluate coverpoints while the defs file is parsed, one coverage group at a time.
+
+        Only the coverage group being expanded is held in defs_data, so the memory used by the input is
+        bounded by its largest group. The groups are yielded in the order of the file instead of sorted.
+        A parse or expansion error is raised mid-stream, dump_stream then discards the partial output.
+
+        Args:
+            input_path (str): Path to the defs file.
+            selector (Selector): Expand only the selected coverage groups and labels, the others are skipped.
+
+        Yields:
+            tuple: A tuple (curr_cov, labels) where labels is a generator of (label, value) tuples.
+                Each labels generator must be consumed before advancing to the next group.
+        """
+        self.dedupe_index = DedupIndex(self.canonical_coverpoint, self.dedupe) if self.dedupe is not None else None
+        for curr_cov, group in self.iter_groups(input_path):
+            self.defs_data = {curr_cov: group}
+            if selector is not None:
+                self.defs_data = selector.select(self.defs_data)
+                if not self.defs_data:
+                    continue
+            data = self.cache_lookup(curr_cov)
+            if data is None:
+                labels = self.evaluate_group(curr_cov)
+            else:
+                labels = ((label, data[label]) for label in self.sorted_keys(data))
+            yield curr_cov, labels if self.dedupe_index is None else self.dedupe_labels(curr_cov, labels)
+
+    def load_yaml(self, input_path):
+        """Load YAML data from the given file path.
+
+        Args:
+            input_path (str): Path to the YAML file to load.
+
+        Raises:
+            FileNotFoundError: If the specified file is not found.
+        """
+        self.defs_data = None
+        self.compiled_lines = None
+        if not os.path.exists(input_path):
+            raise FileNotFoundError(f"{input_path} does not exist.")
+        try:
+            with open(input_path, 'r') as file:
+                yaml_data = yaml.load(file, Loader=self.yaml_loader)
+            self.defs_data = yaml_data
+        except Exception as e:
+            print(f"Failed to load YAML file: {e}")
+
+    def load_planned(self, input_path, plan_path):
+        """Load a defs file from its plan artifact, rebuilding the artifact if it is missing or out of date.
+
+        An up to date artifact replaces both the parsing of the YAML and the resolution of the braces,
+        every line is expanded straight from its compiled plan. Groups expanded in worker processes
+        compile their lines again.
+
+        Args:
+            input_path (str): Path to the defs file.
+            plan_path (str): Path of the plan artifact, see save_plan.
+
+        Raises:
+            FileNotFoundError: If the defs file is not found.
+
+        Returns:
+            bool: True if the artifact was up to date, False if it was rebuilt.
+        """
+        planned = self.load_plan(plan_path, input_path)
+        if planned is not None:
+            self.defs_data, self.compiled_lines = planned
+            return True
+        self.save_plan(input_path, plan_path)
+        return False
+
+    def save_plan(self, input_path, plan_path):
+        """Load a defs file and save its parsed and compiled form as a plan artifact.
+
+        The artifact holds a header with the artifact format, the translator version and the hash of
+        the defs file, followed by the defs data and the compiled lines. The header is checked by
+        load_plan before the rest is read. The loaded data is left in defs_data and compiled_lines.
+
+        Args:
+            input_path (str): Path to the defs file.
+            plan_path (str): Path to save the plan artifact.
+
+        Raises:
+            FileNotFoundError: If the defs file is not found.
+        """
+        if not os.path.exists(input_path):
+            raise FileNotFoundError(f"{input_path} does not exist.")
+        # Hashed before loading, an artifact of a file changed in between is out of date on the next run
+        source_hash = self.source_hash(input_path)
+        self.load_yaml(input_path)
+        if not isinstance(self.defs_data, dict):
+            return
+        self.compiled_lines = self.compile_lines(self.defs_data)
+
+        header = {'format': PLAN_FORMAT, 'translator_version': TRANSLATOR_VERSION, 'source_hash': source_hash}
+        temp_path = f'{plan_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(temp_path, 'wb') as file:
+                pickle.dump(header, file, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump((self.defs_data, self.compiled_lines), file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, plan_path)
+        except Exception as e:
+            print(f"Failed to write plan artifact: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def load_plan(self, plan_path, input_path=None):
+        """
+        Read a plan artifact written by save_plan.
+
+        Artifacts are pickles, only load the ones written by a trusted translator.
+
+        Args:
+            plan_path (str): Path of the plan artifact.
+            input_path (str): Path to the defs file the artifact must have been built from, the
+                source is not checked if None.
+
+        Returns:
+            tuple: A tuple (defs_data, compiled_lines), or None if the artifact is missing, unreadable,
+                of another format or translator version, or if the defs file changed since it was built.
+        """
+        try:
+            with open(plan_path, 'rb') as file:
+                header = pickle.load(file)
+                if not isinstance(header, dict) or header.get('format') != PLAN_FORMAT \
+                        or header.get('translator_version') != TRANSLATOR_VERSION:
+                    return None
+                if input_path is not None and header.get('source_hash') != self.source_hash(input_path):
+                    return None
+                return pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return None
+
+    def source_hash(self, input_path):
+        """Return the SHA-256 hexadecimal digest of the content of a file."""
+        digest = hashlib.sha256()
+        with open(input_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def compile_lines(self, defs_data):
+        """
+        Compile every line of the defs data ahead of the expansion.
+
+        Lines are keyed by their text, as their plan depends on nothing else. A line that fails to
+        compile is left out, so its error is raised by the expansion, where translate raises it.
+
+        Args:
+            defs_data (dict): The defs data.
+
+        Returns:
+            dict: The tuple (plan, replacement_dict) returned by compile_line, by line.
+        """
+        compiled_lines = {}
+        for group in defs_data.values():
+            if not isinstance(group, dict):
+                continue
+            for line in group.values():
+                if not isinstance(line, dict):
+                    continue
+                for instr in line:
+                    if instr in compiled_lines:
+                        continue
+                    try:
+                        compiled_lines[instr] = self.compile_line(instr)
+                    except Exception:
+                        continue
+        return compiled_lines
+
+    def dump_data(self, output_path, yaml_data):
+        """Dump the given YAML data into the specified file.
+
+        Args:
+            output_path (str): Path to save the YAML data.
+            yaml_data (dict): YAML data to be dumped.
+
+        Raises:
+            Exception: If an error occurs while writing data to the file.
+        """
+        try:
+            with open(output_path, 'w') as file:
+                yaml.dump(yaml_data, file, Dumper=self.yaml_dumper)
+        except Exception as e:
+            print(f"Failed to write data to file: {e}")
+
+    def patch_data(self, output_path, yaml_data, selector=None):
+        """Replace groups and labels of an existing CGF file with newly expanded ones.
+
+        The selected groups and labels of the file that are missing from the expanded data are removed,
+        as they no longer expand to anything.
+
+        Args:
+            output_path (str): Path of the CGF file to patch, a missing file is patched like an empty one.
+            yaml_data (dict): The expanded groups and labels.
+            selector (Selector): The groups and labels that were expanded, all of them if None.
+
+        Raises:
+            ValueError: If the existing file is not a mapping of coverage groups.
+
+        Returns:
+            dict: The patched data.
+        """
+        patched = {}
+        if os.path.exists(output_path):
+            with open(output_path, 'r') as file:
+                patched = yaml.load(file, Loader=self.yaml_loader) or {}
+            if not isinstance(patched, dict):
+                raise ValueError(f"{output_path} is not a CGF file that can be patched.")
+        selector = selector if selector is not None else Selector()
+        for curr_cov, group in list(patched.items()):
+            if not selector.match_group(curr_cov):
+                continue
+            labels = yaml_data.get(curr_cov)
+            if labels is None and not selector.labels:
+                del patched[curr_cov]
+            elif isinstance(group, dict):
+                fresh = labels if isinstance(labels, dict) else {}
+                for label, value in list(group.items()):
+                    # Labels that are not expanded, such as config, are only written again with their group
+                    selected = selector.match_label(label) if isinstance(value, dict) else labels is not None
+                    if selected and label not in fresh:
+                        del group[label]
+        for curr_cov, labels in yaml_data.items():
+            if not isinstance(patched.get(curr_cov), dict) or not isinstance(labels, dict):
+                patched[curr_cov] = labels
+            else:
+                patched[curr_cov].update(labels)
+        return patched
+
+    def dump_shards(self, output_path, yaml_data, shards, level='group'):
+        """Dump YAML data into several files balanced by coverpoint count, with a manifest.
+
+        The shards of output.cgf are written to output.0.cgf, output.1.cgf, ... and the manifest listing
+        the groups and labels of every shard to output.manifest.json.
+
+        Args:
+            output_path (str): Path the shard and manifest paths are derived from.
+            yaml_data (dict): YAML data to be dumped.
+            shards (int): Number of shards.
+            level (str): 'group' or 'label', see shard_data.
+
+        Returns:
+            dict: The manifest.
+        """
+        stem, extension = os.path.splitext(output_path)
+        manifest = {'level': level, 'shards': []}
+        for index, (data, count) in enumerate(self.shard_data(yaml_data, shards, level)):
+            path = f"{stem}.{index}{extension}"
+            self.dump_data(path, data)
+            manifest['shards'].append({
+                'path': path,
+                'coverpoints': count,
+                'groups': {curr_cov: list(labels) for curr_cov, labels in data.items()},
+            })
+        try:
+            with open(f"{stem}.manifest.json", 'w') as file:
+                json.dump(manifest, file, indent=2)
+        except OSError as e:
+            print(f"Failed to write data to file: {e}")
+        return manifest
+
+    def shard_data(self, yaml_data, shards, level='group'):
+        """Split YAML data into shards balanced by coverpoint count.
+
+        The largest units are placed first, each one into the shard with the fewest coverpoints so far.
+        Labels that are not expanded, such as config, are copied into every shard holding labels of their group.
+
+        Args:
+            yaml_data (dict): YAML data to be split.
+            shards (int): Number of shards.
+            level (str): 'group' to keep every coverage group in a single shard, 'label' to
+                distribute the labels of a group over several shards.
+
+        Raises:
+            ValueError: If the number of shards is not positive or the level is unknown.
+
+        Returns:
+            list: A tuple (data, count) for every shard, with its YAML data and its number of coverpoints.
+        """
+        if shards < 1:
+            raise ValueError(f"Invalid number of shards {shards}: Expected a positive number.")
+        if level not in ('group', 'label'):
+            raise ValueError(f"Unknown shard level {level}: Expected 'group' or 'label'.")
+
+        units = []
+        for curr_cov in self.sorted_keys(yaml_data):
+            labels = [label for label in self.sorted_keys(yaml_data[curr_cov])
+                      if isinstance(yaml_data[curr_cov][label], dict)]
+            if level == 'group' or not labels:
+                units.append((sum(len(yaml_data[curr_cov][label]) for label in labels), curr_cov, labels))
+            else:
+                units.extend((len(yaml_data[curr_cov][label]), curr_cov, [label]) for label in labels)
+        # Stable sort, units of equal size keep the order of the CGF file
+        units.sort(key=lambda unit: -unit[0])
+
+        loads = [(0, index) for index in range(shards)]
+        selected = [{} for _ in range(shards)]
+        for count, curr_cov, labels in units:
+            load, index = heapq.heappop(loads)
+            selected[index].setdefault(curr_cov, []).extend(labels)
+            heapq.heappush(loads, (load + count, index))
+
+        result = []
+        for index in range(shards):
+            data = {}
+            for curr_cov in self.sorted_keys(selected[index]):
+                group = yaml_data[curr_cov]
+                keep = set(selected[index][curr_cov])
+                data[curr_cov] = {label: group[label] for label in group
+                                  if label in keep or not isinstance(group[label], dict)}
+            result.append((data, self.count_coverpoints(data)))
+        return result
+
+    def dump_stream(self, output_path, groups):
+        """Dump coverage groups into the specified file as soon as each label is complete.
+
+        The document is written through the YAML event API, so only the label currently being
+        emitted is held in memory. Groups and labels must be supplied in sorted order (as
+        evaluate_stream does) for the output to match dump_data. Objects shared between labels
+        are written out in full instead of through YAML anchors.
+
+        The document is written to a temporary file that replaces the output file once every group
+        is written, so an error raised while the groups are expanded leaves the previous output intact.
+
+        Args:
+            output_path (str): Path to save the YAML data.
+            groups (iterable): Iterable of (curr_cov, labels) tuples where labels is an iterable
+                of (label, value) tuples.
+
+        Returns:
+            int: The number of coverpoints written.
+
+        Raises:
+            Exception: If an error occurs while writing data to the file.
+        """
+        count = 0
+        temp_path = f'{output_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            try:
+                with open(temp_path, 'w') as file:
+                    dumper = self.yaml_dumper(file, default_flow_style=False, sort_keys=True)
+                    dumper.open()
+                    dumper.emit(yaml.DocumentStartEvent(explicit=False))
+                    dumper.emit(yaml.MappingStartEvent(None, 'tag:yaml.org,2002:map', True, flow_style=False))
+                    for curr_cov, labels in groups:
+                        self.emit_data(dumper, curr_cov)
+                        dumper.emit(yaml.MappingStartEvent(None, 'tag:yaml.org,2002:map', True, flow_style=False))
+                        for label, value in labels:
+                            self.emit_data(dumper, label)
+                            self.emit_data(dumper, value)
+                            if isinstance(value, dict):
+                                count += len(value)
+                        dumper.emit(yaml.MappingEndEvent())
+                    dumper.emit(yaml.MappingEndEvent())
+                    dumper.emit(yaml.DocumentEndEvent(explicit=False))
+                    dumper.close()
+                os.replace(temp_path, output_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+        except (OSError, yaml.YAMLError) as e:
+            print(f"Failed to write data to file: {e}")
+        return count
+
+    def evaluate_cp(self, jobs=1, selector=None, unselected='skip'):
+        """Evaluate coverpoints based on the loaded YAML data.
+
+        Args:
+            jobs (int): Number of worker processes used to expand the coverage groups.
+            selector (Selector): Expand only the selected coverage groups and labels.
+            unselected (str): 'skip' to leave the groups and labels that are not selected out of data_yaml,
+                'passthrough' to copy them from the defs data without expanding them.
+        """
+        if selector is not None:
+            defs_data = self.defs_data
+            self.defs_data = selector.select(defs_data)
+            try:
+                self.evaluate_cp(jobs)
+            finally:
+                self.defs_data = defs_data
+            if unselected == 'passthrough':
+                self.data_yaml = self.passthrough_data(defs_data, self.data_yaml, selector)
+            return
+
+        self.data_yaml = {}
+        pending = []
+        for curr_cov in self.defs_data:
+            # Cached groups are spliced in, None keeps the position of the groups still to expand
+            self.data_yaml[curr_cov] = self.cache_lookup(curr_cov)
+            if self.data_yaml[curr_cov] is None:
+                pending.append(curr_cov)
+
+        if jobs > 1 and len(pending) > 1:
+            for curr_cov, data in zip(pending, self.map_groups(pending, jobs)):
+                self.data_yaml[curr_cov] = data
+        else:
+            for curr_cov in pending:
+                self.data_yaml[curr_cov] = {}  # Initialize a new coverpoint dictionary for current coverage point
+                for label in self.defs_data[curr_cov]:
+                    self.finder(curr_cov,label)
+
+        for curr_cov in pending:
+            self.cache_store(curr_cov, self.data_yaml[curr_cov])
+
+        if self.dedupe is not None:
+            self.data_yaml = self.dedupe_data(self.data_yaml)
+
+    def evaluate_compact(self, jobs=1):
+        """Evaluate coverpoints based on the loaded YAML data into a CoverpointStore.
+
+        The coverpoints are stored as text in a single buffer instead of one string and dictionary
+        entry each, so the memory used stays close to the size of the output.
+
+        Args:
+            jobs (int): Number of worker processes used to expand the coverage groups.
+
+        Returns:
+            CoverpointStore: The translated data.
+        """
+        store = CoverpointStore()
+        for curr_cov, data in self.expanded_groups(list(self.defs_data), jobs):
+            store.group_id(curr_cov)
+            if data is not None:
+                store.update(curr_cov, data)
+                continue
+
+            self.store = store
+            try:
+                for label in self.defs_data[curr_cov]:
+                    self.finder(curr_cov, label)
+            finally:
+                self.store = None
+            if self.cache is not None:
+                self.cache_store(curr_cov, dict(store.labels(curr_cov, list)))
+        return store
+
+    def passthrough_data(self, defs_data, data_yaml, selector):
+        """
+        Complete the expanded selection with the groups and labels of the defs data that were not selected.
+
+        Args:
+            defs_data (dict): The complete defs data.
+            data_yaml (dict): The expanded groups and labels.
+            selector (Selector): The selector data_yaml was expanded with.
+
+        Returns:
+            dict: The data in the order of the defs data, unselected groups and labels copied as written.
+        """
+        merged = {}
+        for curr_cov, group in defs_data.items():
+            if curr_cov not in data_yaml or not isinstance(group, dict):
+                merged[curr_cov] = group
+                continue
+            expanded = data_yaml[curr_cov]
+            merged[curr_cov] = {}
+            for label, value in group.items():
+                if label in expanded:
+                    merged[curr_cov][label] = expanded[label]
+                # A selected label that produced nothing is left out, as in a complete translation
+                elif isinstance(value, dict) and not selector.match_label(label):
+                    merged[curr_cov][label] = value
+        return merged
+
+    def evaluate_stream(self, jobs=1):
+        """Evaluate coverpoints lazily, one coverage group at a time, in sorted order.
+
+        Args:
+            jobs (int): Number of worker processes used to expand the coverage groups.
+
+        Yields:
+            tuple: A tuple (curr_cov, labels) where labels is a generator of (label, value) tuples.
+                Each labels generator must be consumed before advancing to the next group.
+        """
+        self.dedupe_index = DedupIndex(self.canonical_coverpoint, self.dedupe) if self.dedupe is not None else None
+        for curr_cov, data in self.expanded_groups(self.sorted_keys(self.defs_data), jobs):
+            if data is None:
+                labels = self.evaluate_group(curr_cov)
+            else:
+                labels = ((label, data[label]) for label in self.sorted_keys(data))
+            yield curr_cov, labels if self.dedupe_index is None else self.dedupe_labels(curr_cov, labels)
+
+    def dedupe_data(self, data_yaml):
+        """Find the duplicate coverpoints of a whole document, in the order of the groups and labels of the CGF file.
+
+        A new dedupe_index is started, its stats and duplicates describe this document.
+
+        Args:
+            data_yaml (dict): The translated data.
+
+        Returns:
+            dict: The translated data without the duplicates in 'drop' mode, otherwise the data unchanged.
+        """
+        self.dedupe_index = DedupIndex(self.canonical_coverpoint, self.dedupe)
+        kept = {}
+        for curr_cov in self.sorted_keys(data_yaml):
+            labels = ((label, data_yaml[curr_cov][label]) for label in self.sorted_keys(data_yaml[curr_cov]))
+            for label, value in self.dedupe_labels(curr_cov, labels):
+                kept[curr_cov, label] = value
+        return {curr_cov: {label: kept[curr_cov, label] for label in data_yaml[curr_cov]} for curr_cov in data_yaml}
+
+    def dedupe_labels(self, curr_cov, labels):
+        """
+        Pass the labels of a coverage group through the dedupe index.
+
+        Args:
+            curr_cov (str): The coverage group.
+            labels (iterable): Iterable of (label, value) tuples, in sorted order.
+
+        Yields:
+            tuple: A tuple (label, value) for every label, the labels that are not expanded are left as is.
+        """
+        for label, value in labels:
+            if isinstance(value, dict):
+                value = self.dedupe_index.filter(curr_cov, label, value)
+            yield label, value
+
+    def expanded_groups(self, groups, jobs):
+        """
+        Fetch the coverage groups that are cached or can be expanded in a process pool, one at a time.
+
+        When several groups are not cached and jobs > 1, they are expanded by map_groups, counted as cache
+        misses and stored in the cache. The other groups are looked up in the cache.
+
+        Args:
+            groups (list): The coverage groups, in the order they are needed.
+            jobs (int): Number of worker processes used to expand the coverage groups.
+
+        Yields:
+            tuple: A tuple (curr_cov, data) for every group, where data holds its expanded labels, or is
+                None if the group must be expanded by the caller.
+        """
+        pending = []
+        if jobs > 1:
+            pending = [curr_cov for curr_cov in groups
+                       if self.cache is None or self.cache_key(curr_cov) not in self.cache]
+        if len(pending) > 1:
+            if self.cache is not None:
+                with self.cache.lock:
+                    self.cache.misses += len(pending)
+            results = self.map_groups(pending, jobs)
+            pending = set(pending)
+        else:
+            pending = set()
+
+        for curr_cov in groups:
+            if curr_cov in pending:
+                data = next(results)
+                self.cache_store(curr_cov, data)
+            else:
+                data = self.cache_lookup(curr_cov)
+            yield curr_cov, data
+
+    def map_groups(self, groups, jobs):
+        """Expand coverage groups in a process pool.
+
+        Every worker receives a copy of this translator, so the results are identical to a serial run.
+
+        Args:
+            groups (list): The coverage groups to expand.
+            jobs (int): Number of worker processes.
+
+        Yields:
+            dict: The expanded labels of every group, in the order of groups.
+        """
+        with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(self,)) as pool:
+            tasks = ((curr_cov, self.defs_data[curr_cov]) for curr_cov in groups)
+            yield from pool.map(translate_group, tasks)
+
+    def evaluate_group(self, curr_cov):
+        """Evaluate the labels of a single coverage group, in sorted order.
+
+        Args:
+            curr_cov (str): The coverage group to evaluate.
+
+        Yields:
+            tuple: A tuple (label, value) for every label that produced output.
+        """
+        self.data_yaml = {curr_cov: {}}
+        collected = {} if self.cache is not None else None
+        for label in self.sorted_keys(self.defs_data[curr_cov]):
+            self.finder(curr_cov, label)
+            if label in self.data_yaml[curr_cov]:
+                value = self.data_yaml[curr_cov].pop(label)
+                if collected is not None:
+                    collected[label] = value
+                yield label, value
 
-2. ${} Macro Usage:
-   - Use ${} to reference macros defined in macros.yaml.
-   - They are not dealt in this script, will be resolved in the RISC-V ISAC
-   - Macros are constants or predefined coverpoint values.
-   - Example: ${MACRO_NAME}
+        if collected is not None:
+            self.cache_store(curr_cov, collected)
 
-3. $number Placeholder:
-   - Use $number to refer to values from curly brackets in the same line.
-   - Each $number corresponds to a value in the curly brackets in order of appearance.
-   - Example: (pmpcfg{0 ... 10} >> 8) and (pmpcfg$1 == 0x80)
+    def cache_key(self, curr_cov):
+        """
+        Hash the source of a coverage group together with the translator version and the options that alter the output.
 
-4. {value1, value2, ...} Loop:
-   - Lists enclosed in curly brackets will generate coverpoints by iterating through values.
-   - Each value will be used as a coverpoint.
-   - Example: "{lw, sw, csrrw}": 0 will generate coverpoints for lw, sw, and csrrw.
+        The coverpoint limit is part of the key, as a cached group is reused without checking its lines against it.
 
-5. {{val1, val2, end_val} <operation> <digit>} Enumeration with Operation:
-   - Use double curly brackets with an operation to enumerate values.
-   - Values will be enumerated based on the specified operation and digit.
-   - Example: {{0, 8, 16, 24} >> 4} will enumerate values {0, 0, 1, 1}.
+        Args:
+            curr_cov (str): The coverage group.
 
-6. {{val1 ... end_val} <operation> <digit>} Advanced Range Enumeration:
-   - Advanced version of point 1 allowing repeated values in the range.
-   - Each value in the range will be repeated based on the specified operation and digit.
-   - Example: {{0 ... 3} * 4} will generate {0, 4, 8, 12}.
+        Returns:
+            str: The hexadecimal digest used as cache key.
+        """
+        folding = (self.fold_constants, sorted(self.macros.items())) if self.fold_constants else False
+        limit = (self.max_coverpoints, self.on_limit) if self.max_coverpoints is not None else None
+        source = repr((TRANSLATOR_VERSION, self.expansion_mode, folding, limit, curr_cov, self.defs_data[curr_cov]))
+        return hashlib.sha256(source.encode('utf-8', 'surrogatepass')).hexdigest()
 
-****************************************************************************************************
-'''
+    def cache_lookup(self, curr_cov):
+        """
+        Fetch the expanded labels of a coverage group from the cache.
 
-class Translator:
-    """A class for translating YAML data and generating coverpoints."""
+        Args:
+            curr_cov (str): The coverage group.
 
-    def __init__(self):
-        """Initialize the Translator object."""
-        self.defs_data = None
-        self.data_yaml = None
-        self.replacement_dict = {}
-        self.replacement_dict_resolved = {}
-        self.number_replace_order = {}
-        self.curr_cov = None
-        self.label = None
+        Returns:
+            dict: The expanded labels, or None if there is no cache or the group is not cached.
+        """
+        if self.cache is None:
+            return None
+        return self.cache.get(self.cache_key(curr_cov))
 
-        self.braces_finder          = re.compile(r'({.*?})')
-        self.multi_brace_finder     = re.compile(r'({\s*{.*?}.*?})')
-        self.macro_def_finder       = re.compile(r'(\${.*?})') # ${variable}To ignore any such definition
-        self.number_brace_finder    = re.compile(r'(\$\d+)')   # $1
-        self.macro_brace_resolver   = re.compile(r'(\%\d+)')   # 
-        self.repeat_brace_index     = re.compile(r'(\*\d+)')
-        self.placeholder_pattern = re.compile(r'<<MULTI\d+>>|<<SINGLE\d+>>|<<COMMA\d+>>')
+    def cache_store(self, curr_cov, data):
+        """
+        Store the expanded labels of a coverage group in the cache, if there is one.
 
-    def translate(self, input_path, output_path):
-        """Translate YAML data from the input file and dump it into the output file.
-        
         Args:
-            input_path (str): Path to the input YAML file.
-            output_path (str): Path to save the translated YAML data.
+            curr_cov (str): The coverage group.
+            data (dict): The expanded labels.
         """
-        self.load_yaml(input_path)
-        self.evaluate_cp()
-        self.dump_data(output_path, self.data_yaml)
+        if self.cache is not None:
+            self.cache.put(self.cache_key(curr_cov), data)
 
-    def load_yaml(self, input_path):
-        """Load YAML data from the given file path.
+    @contextual
+    def count(self, input_path, plan_path=None, selector=None):
+        """Count the coverpoints of a defs file without generating them.
 
         Args:
-            input_path (str): Path to the YAML file to load.
+            input_path (str): Path to the input YAML file.
+            plan_path (str): Path of a plan artifact of the input, see load_planned.
+            selector (Selector): Count only the selected coverage groups and labels.
+            context (TranslationContext): The working state of the count, a new one if None.
 
-        Raises:
-            FileNotFoundError: If the specified file is not found.
+        Returns:
+            dict: The number of coverpoints of every label holding coverpoints, per coverage group.
         """
-        if not os.path.exists(input_path):
-            raise FileNotFoundError(f"{input_path} does not exist.")
-        try:
-            with open(input_path, 'r') as file:
-                yaml_data = yaml.safe_load(file)
-            self.defs_data = yaml_data
-        except Exception as e:
-            print(f"Failed to load YAML file: {e}")
+        if plan_path is not None:
+            self.load_planned(input_path, plan_path)
+        else:
+            self.load_yaml(input_path)
+        return self.count_cp(selector)
 
-    def dump_data(self, output_path, yaml_data):
-        """Dump the given YAML data into the specified file.
+    def count_cp(self, selector=None):
+        """Count the coverpoints of the loaded YAML data without generating them.
+
+        Only the number of values of every brace is resolved, so even lines expanding to millions of
+        coverpoints are counted instantly. Operations are not evaluated and coverpoints that turn out
+        identical are counted every time, the result is an upper bound of the generated coverpoints.
 
         Args:
-            output_path (str): Path to save the YAML data.
-            yaml_data (dict): YAML data to be dumped.
+            selector (Selector): Count only the selected coverage groups and labels.
 
-        Raises:
-            Exception: If an error occurs while writing data to the file.
+        Returns:
+            dict: The number of coverpoints of every label holding coverpoints, per coverage group.
         """
-        try:
-            with open(output_path, 'w') as file:
-                yaml.dump(yaml_data, file)
-        except Exception as e:
-            print(f"Failed to write data to file: {e}")
+        defs_data = selector.select(self.defs_data) if selector is not None else self.defs_data
+        counts = {}
+        for curr_cov in defs_data:
+            counts[curr_cov] = {}
+            for label, line in defs_data[curr_cov].items():
+                if isinstance(line, dict):
+                    counts[curr_cov][label] = sum(self.count_key(instr) for instr in line)
+        return counts
+
+    def count_key(self, instr):
+        """
+        Count the coverpoints a single line expands to.
 
-    def evaluate_cp(self):
-        """Evaluate coverpoints based on the loaded YAML data."""
-        self.data_yaml = {}
-        for curr_cov in self.defs_data:
-            self.data_yaml[curr_cov] = {}  # Initialize a new coverpoint dictionary for current coverage point
-            for label in self.defs_data[curr_cov]:
-                self.finder(curr_cov,label)
+        Args:
+            instr (str): The instruction string.
+
+        Raises:
+            ValueError: If a brace is invalid.
+            IndexError: If a $number placeholder does not refer to a brace.
+
+        Returns:
+            int: The number of coverpoints.
+        """
+        compiled = self.compiled_lines.get(instr) if self.compiled_lines is not None else None
+        if compiled is not None:
+            sizes = {key: len(val) for key, val in compiled[1].items()}
+            return self.expansion_count(sizes) if sizes else 1
+
+        tokens, place_holder_pattern = self.tokenize(instr)
+        sizes = {}
+        for kind, value in tokens:
+            if kind == MULTI:
+                slot, (internal, range_list, operation, digit) = value
+                sizes[(INNER, slot[1])] = len(internal)
+                sizes[slot] = len(range_list)
+            elif kind in (RANGE, LIST):
+                slot, parsed = value
+                sizes[slot] = len(parsed)
+
+        for kind, value in tokens:
+            if kind == NUMBER and not -len(place_holder_pattern) <= value - 1 < len(place_holder_pattern):
+                raise IndexError(f"${value} does not refer to a brace in {instr}.")
+
+        # A line without braces is generated as is
+        return self.expansion_count(sizes) if sizes else 1
 
     def finder(self, curr_cov, label):
         """
@@ -129,338 +1991,484 @@ class Translator:
         self.label = label
         line = self.defs_data[curr_cov][label]
         if isinstance(line, dict):
+            compiled_lines = self.compiled_lines
             for instr in line:
-                # Clean replacement dict on every iteration
-                self.replacement_dict = {}
-
-                # Process macros
-                macros = self.macro_def_finder.findall(instr)
-                instr = self.replace_macros(instr, macros)
-
-                # Process multibraces
-                instr = self.replace_multibraces(instr)
-
-                # Process single braces and comma-separated values
-                instr = self.replace_braces_commas(instr)
-
-                # Process $number placeholders
-                instr = self.replace_number_placeholders(instr)
-
-                # Check the order of every brace and maintain with the $number placeholder
-                place_holder_pattern = self.replace_order_pattern(instr)
-
-                # Resolve every brace found in the string
-
-                # Resolve the single braces and multi_internal braces
-                self.resolve_single_brace(self.replacement_dict)
-
-                # Resolve the multibraces
-                self.resolve_multibraces(self.replacement_dict)
-
-                # Resolve the comma separated
-                self.resolve_comma_brace(self.replacement_dict)
-
-                # Substitute the values in the coverpoint
+                self.instr = instr
+                # Lines compiled ahead of time by a plan artifact skip straight to the expansion
+                compiled = compiled_lines.get(instr) if compiled_lines is not None else None
+                plan, self.replacement_dict = compiled if compiled is not None else self.compile_line(instr)
 
                 # Complete the coverpoint process
-                self.calculate_coverpoints(instr, self.replacement_dict, place_holder_pattern)
+                self.calculate_coverpoints(plan, self.replacement_dict)
 
                 # If there is no substitution, then generate
                 if len(self.replacement_dict) == 0:
                     self.generator(curr_cov, label, instr, 1)
 
+            self.instr = None
+
         # Generate the coverpoint not of interest
         else:
             self.generator(curr_cov, label, line, 0)
 
-    def replace_macros(self, instr, macros):
+    def compile_line(self, instr):
         """
-        Replace macros in the instruction with placeholders.
+        Resolve the braces of a line and compile it into an expansion plan.
 
         Args:
             instr (str): The instruction string.
-            macros (list): List of macros to replace.
+
+        Raises:
+            ValueError: If a brace is invalid.
 
         Returns:
-            str: The instruction string with macros replaced.
+            tuple: A tuple (plan, replacement_dict) with the plan returned by compile_plan and the resolved slots.
         """
-        macro_dict = {macro: f'<<MACRO{index}>>' for index, macro in enumerate(macros)}
-        instr, replacements = self.replace_using_dict(instr, macro_dict)
-        self.replacement_dict.update(replacements)
-        return instr
+        # Split the line into literals, macros, parsed braces and $number placeholders in one scan
+        tokens, place_holder_pattern = self.tokenize(instr)
 
-    def replace_multibraces(self, instr):
+        # Resolve the values of every brace found in the string
+        self.resolve_braces(tokens)
+
+        # Compile the coverpoint into an expansion plan
+        plan = self.compile_plan(tokens, self.replacement_dict, place_holder_pattern)
+        return plan, self.replacement_dict
+
+    def tokenize(self, instr):
         """
-        Replace multibraces in the instruction with placeholders.
+        Split a line into typed tokens in a single scan.
+
+        Every brace is parsed as it is found: a range brace carries its values, a list brace the list
+        of its values and a multibrace its internal values, its values, its operation and its operand,
+        so the resolvers and count_key work on the tokens instead of searching the brace text again.
+        Every brace gets a slot of its own, even when its text repeats an earlier brace, so each one is
+        a loop of its own in product mode. A multibrace also gets an INNER slot for its internal brace.
 
         Args:
-            instr (str): The instruction string containing multibraces.
+            instr (str): The instruction string.
+
+        Raises:
+            ValueError: If a brace is invalid.
 
         Returns:
-            str: The instruction string with multibraces replaced.
+            tuple: A tuple (tokens, place_holder_pattern) where tokens is a list of (kind, value) tuples
+                and place_holder_pattern lists the slots in the order the $number placeholders refer to them.
         """
-        replacements = {}
-        global_multi_index = 0
+        tokens = []
+        numbering = {}
+        parsed_braces = {}
+        position = 0
+
+        for match in self.token_finder.finditer(instr):
+            if match.start() > position:
+                tokens.append((LITERAL, instr[position:match.start()]))
+            position = match.end()
+            kind, text = match.lastgroup, match.group(0)
+
+            if kind == 'macro':
+                tokens.append((MACRO, text))
+                continue
+
+            if kind == 'number':
+                tokens.append((NUMBER, int(text[1:])))
+                continue
+
+            index = len(tokens)
+            if kind == 'multi':
+                slot = (MULTI, index)
+                tokens.append((MULTI, (slot, self.resolve_fragment(MULTI, text, self.parse_multibrace))))
+                numbering[slot] = [(INNER, index), slot]
+                continue
+
+            category = RANGE if '...' in text else LIST
+            parsed = parsed_braces.get(text)
+            if parsed is None:
+                parse = self.parse_single_brace if category == RANGE else self.split_list
+                parsed = parsed_braces[text] = self.resolve_fragment(category, text, parse)
+            slot = (category, index)
+            tokens.append((category, (slot, parsed)))
+            numbering.setdefault(text, []).append(slot)
+
+        if position < len(instr):
+            tokens.append((LITERAL, instr[position:]))
+
+        # $number counts the braces in order of first appearance, the repeats of a brace right after it
+        # and the internal brace of a multibrace right before the multibrace itself
+        place_holder_pattern = [slot for slots in numbering.values() for slot in slots]
+
+        return tokens, place_holder_pattern
+
+    def resolve_braces(self, tokens):
+        """
+        Resolve the values of the braces of a line into the replacement dictionary.
+
+        Range and list braces keep their parsed values, the operation of a multibrace is applied to
+        its values and its internal brace keeps the values it was parsed into.
 
-        def replace_braces(match, instr_string):
-            nonlocal replacements, global_multi_index
-            instr = instr_string
-            multi_braces = match.group(0)
-            internal_braces = self.braces_finder.findall(multi_braces[1:-1])
-            for index, brace in enumerate(internal_braces):
-                placeholder = f'<<MULTI_INTER{global_multi_index}>>'
-                instr = instr.replace(brace, placeholder)
-                replacements[placeholder] = brace
-            placeholder = f'<<MULTI{global_multi_index}>>'
-            instr = instr.replace(multi_braces, placeholder)
-            replacements[placeholder] = multi_braces
-            global_multi_index += 1
-            return placeholder
+        Args:
+            tokens (list): The tokens returned by tokenize.
+
+        Raises:
+            ValueError: If the operation of a multibrace is invalid.
+
+        Returns:
+            dict: The values of every slot, in order of first appearance.
+        """
+        replacement_dict = {}
+        for kind, value in tokens:
+            if kind == MULTI:
+                slot, (internal, range_list, operation, digit) = value
+                replacement_dict[(INNER, slot[1])] = internal
+                replacement_dict[slot] = self.resolve_multibrace(range_list, operation, digit)
+            elif kind in (RANGE, LIST):
+                slot, parsed = value
+                replacement_dict[slot] = parsed
 
-        instr = re.sub(self.multi_brace_finder, lambda match: replace_braces(match, instr), instr)
-        self.replacement_dict.update(replacements)
-        return instr
+        self.replacement_dict = replacement_dict
+        return replacement_dict
 
-    def replace_braces_commas(self, instr):
+    def parse_single_brace(self, val):
         """
-        Replace single braces and comma-separated values in the instruction with placeholders.
+        Parse a single brace or the internal brace of a multibrace.
 
         Args:
-            instr (str): The instruction string containing single braces and comma-separated values.
+            val (str): The brace, e.g. {0 ... 15} or {0, 8, 16}.
+
+        Raises:
+            ValueError: If the brace is not a valid range or list of integers.
 
         Returns:
-            str: The instruction string with single braces and comma-separated values replaced.
+            range or list: The values of the brace, a range is not materialized.
         """
-        braces = self.braces_finder.findall(instr)
-        comma  = [val for val in braces if "..." not in val]
-        braces = [val for val in braces if "..." in val]
-        comma_dict = {val: f'<<COMMA{index}>>' for index, val in enumerate(comma)}
-        single_dict = {val: f'<<SINGLE{index}>>' for index, val in enumerate(braces)}
-        instr, replacements = self.replace_using_dict(instr, {**comma_dict, **single_dict})
-        self.replacement_dict.update(replacements)
-        return instr
+        digits = self.digit_finder.findall(val)
+        comma_sep_num = self.comma_number_finder.findall(val)
+        if digits:
+            if len(digits) == 2 and int(digits[0]) <= int(digits[1]):
+                start, end = map(int, digits)
+                return range(start, end + 1)
+            elif len(digits) > 2 and comma_sep_num:
+                    return list(map(int, digits))
+            else:
+                raise ValueError(f"Invalid input for key {val}: Expected a valid range of integers")
+        else:
+            raise ValueError(f"Digits not found in the value for key {val}.")
 
-    def replace_number_placeholders(self, instr):
+    def resolve_multibrace(self, range_list, operation, digit):
         """
-        Replace $number placeholders in the instruction string with unique placeholders.
+        Resolve a parsed multibrace into its values.
 
         Args:
-            instr (str): The instruction string containing $number placeholders.
+            range_list (range or list): The values the operation is applied to.
+            operation (str): The operation, one of the keys of OPERATIONS.
+            digit (int or str): The operand of the operation.
 
         Returns:
-            str: The instruction string with $number placeholders replaced.
+            LazyRange or list: The values, ranges are evaluated lazily.
         """
-        # Create a dictionary to store the replacements for each unique $number
-        replace_dict = {}
-        for index, match in enumerate(self.number_brace_finder.finditer(instr)):
-            number = match.group(0)
-            # If the number is encountered for the first time, create a new placeholder
-            if number not in replace_dict:
-                replace_dict[number] = f'<<NUMBER{len(replace_dict)}>>'
-        # Use the replace_using_dict method to perform the replacements
-        instr, replacements = self.replace_using_dict(instr, replace_dict)
-        # Update the replacement dictionary with the placeholders and their original values
-        self.replacement_dict.update(replacements)
-        return instr
+        if isinstance(range_list, range):
+            return LazyRange(range_list, operation, digit)
+        return self.apply_operation(range_list, operation, digit)
 
-    def resolve_single_brace(self, replacement_dict):
+    def parse_multibrace(self, val):
         """
-        Resolve single braces and multi_internal braces in the replacement dictionary.
+        Parse a multibrace into its internal values, its values and its operation.
+
+        The internal brace is parsed like a single brace, as $number placeholders refer to its values.
 
         Args:
-            replacement_dict (dict): A dictionary containing keys with placeholders and values to be resolved.
+            val (str): The multibrace, e.g. {{0 ... 15} >> 2} or {{0, 8, 16} + 1}.
 
         Raises:
-            ValueError: If the input for a placeholder is invalid or if digits are not found in the value.
+            ValueError: If the internal brace is invalid, if the range pattern is not found in the value,
+                if the start of the range is greater than the end, if no operation is specified, or if
+                the digit value is invalid.
 
         Returns:
-            None
+            tuple: A tuple (internal, range_list, operation, digit) where internal is the value of the
+                internal brace and range_list is a range or a list of integers.
         """
-        for key, val in replacement_dict.items():
-            if ("MULTI_INTER" in key or "SINGLE" in key ): #solve the comma seperated digits as well
-                digits = re.findall(r'\d+', val)
-                comma_sep_num = re.findall(r'\{\d+(?:, \d+)*\}', val)
-                if digits:
-                    if len(digits) == 2 and int(digits[0]) <= int(digits[1]):
-                        start, end = map(int, digits)
-                        result = list(range(start, end + 1))
-                        replacement_dict[key] = result
-                    elif len(digits) > 2 and comma_sep_num:
-                            values = list(map(int, digits))
-                            replacement_dict[key] = values
-                    else:
-                        raise ValueError(f"Invalid input for key {val}: Expected a valid range of integers")
+        internal = self.parse_single_brace(self.braces_finder.findall(val[1:-1])[-1])
+        range_match = self.range_finder.search(val)
+        operation_match = self.operation_finder.search(val)
+        comma_sep_num = self.comma_number_finder.findall(val)
+        if range_match:
+            start, end = map(int, range_match.groups())
+            if start <= end:
+                if operation_match:
+                    operation, digit = operation_match.groups()
+                    try:
+                        digit = int(digit)
+                    except ValueError:
+                        raise ValueError(f"Invalid digit value for key {val}.")
+                    return internal, range(start, end + 1), operation, digit
                 else:
-                    raise ValueError(f"Digits not found in the value for key {val}.")
+                    raise ValueError(f"No operation found for key {val}!")
+            else:
+                raise ValueError(f"Invalid range for key {val}: Start must be less than or equal to end.")
+        elif comma_sep_num:
+            internal_digits_list = self.digit_finder.findall(comma_sep_num[0])
+            internal_digits_list = list(map(int, internal_digits_list))
+            if operation_match:
+                operation, digit = operation_match.groups()
+                return internal, internal_digits_list, operation, digit
+            else:
+                raise ValueError(f"No operation found for key {val}!")
+        else:
+            raise ValueError(f"Range pattern not found in the value for key {val}.")
 
-        self.replacement_dict = replacement_dict
+    def resolve_fragment(self, kind, val, parse):
+        """
+        Parse a brace through the fragment cache, so a brace repeated on many lines is parsed once.
+
+        The brace text is the key as written, as the parsing of braces depends on their spacing.
 
-    def resolve_multibraces(self, replacement_dict):
+        Args:
+            kind (str): The kind of brace, RANGE, LIST or MULTI.
+            val (str): The brace.
+            parse (callable): Function parsing the brace when it is not cached.
+
+        Returns:
+            object: The parsed brace, shared with the other lines using the brace.
+        """
+        if self.fragment_cache is None:
+            return parse(val)
+        key = (kind, val)
+        value = self.fragment_cache.get(key)
+        if value is None:
+            value = parse(val)
+            self.fragment_cache.put(key, value)
+        return value
+
+    def split_list(self, val):
         """
-        Resolve multibraces in the replacement dictionary.
+        Split a comma separated brace into its values.
 
         Args:
-            replacement_dict (dict): A dictionary containing keys with placeholders and values to be resolved.
+            val (str): The brace, e.g. {lw, sw, ${csrrs}}.
 
         Raises:
-            ValueError: If the range pattern is not found in the value, if the start of the range is greater than the end,
-                if an invalid operation is specified, or if the digit value is invalid.
+            ValueError: If the value is not enclosed in curly brackets.
 
         Returns:
-            None
+            list: The stripped values, commas inside ${variable} do not split.
         """
-        for key, val in replacement_dict.items():
-            if "MULTI" in key and not "MULTI_INTER" in key :
-                range_match = re.search(r'{(\d+)\s*\.\.\.\s*(\d+)}', val)
-                operation_match = re.search(r'([+\-*/]|<<|>>)\s*(\d+)', val)
-                comma_sep_num = re.findall(r'\{\d+(?:, \d+)*\}', val)
-                if range_match:
-                    start, end = map(int, range_match.groups())
-                    if start <= end:
-                        range_list = list(range(start, end + 1))
-                        if operation_match:
-                            operation, digit = operation_match.groups()
-                            try:
-                                digit = int(digit)
-                            except ValueError:
-                                raise ValueError(f"Invalid digit value for key {val}.")
-                            result_list = self.apply_operation(range_list, operation, digit)
-                            replacement_dict[key] = result_list
-                        else:
-                            raise ValueError(f"No operation found for key {val}!")
-                    else:
-                        raise ValueError(f"Invalid range for key {val}: Start must be less than or equal to end.")
-                elif comma_sep_num:
-                    internal_digits_list = re.findall(r'\d+', comma_sep_num[0])
-                    internal_digits_list = list(map(int, internal_digits_list))
-                    if operation_match:
-                        operation, digit = operation_match.groups()
-                        result_list = self.apply_operation(internal_digits_list, operation, digit)
-                        replacement_dict[key] = result_list
-                    else:
-                        raise ValueError(f"No operation found for key {val}!")
-                else:
-                    raise ValueError(f"Range pattern not found in the value for key {val}.")
-                
-        self.replacement_dict = replacement_dict
-
-    def resolve_comma_brace(self, replacement_dict):
+        if not (val.startswith('{') and val.endswith('}')):
+            raise ValueError(f"Invalid Comma Pattern for {val}")
+        content = val[1:-1]
+        values = []
+        start = 0
+        for match in self.list_separator.finditer(content):
+            if match.group(1):
+                values.append(content[start:match.start()].strip())
+                start = match.end()
+        values.append(content[start:].strip())
+        return values
+
+    def compile_plan(self, tokens, replacement_dict, place_holder_pattern):
         """
-        Resolve comma-separated values in the replacement dictionary.
+        Compile the tokens of a coverpoint into an expansion plan.
 
-        Args:
-            replacement_dict (dict): A dictionary containing keys with placeholders and comma-separated values as strings.
+        Literal and macro tokens are merged into segments and every $number placeholder is bound to the brace
+        it refers to, so each generated coverpoint is built with a single join.
 
-        Raises:
-            ValueError: If the comma pattern is invalid.
+        Args:
+            tokens (list): The tokens returned by tokenize.
+            replacement_dict (dict): A dictionary containing the slots and their resolved values.
+            place_holder_pattern (list): A list containing the slots in $number order.
 
         Returns:
-            None
+            tuple: A tuple (segments, slots, values) where segments holds the literal text around the slots,
+                slots holds the slot bound to each position and values maps every slot to its values as strings.
         """
-        for key, val in replacement_dict.items():
-            if "COMMA" in key and isinstance(val, str):
-                comma_pattern = r'{(.*?)}'
-                comma_match = re.findall(comma_pattern, val)
-                if comma_match:
-                    values = [value.strip() for value in comma_match[0].split(',')]
-                    replacement_dict[key] = values
-                else:
-                    raise ValueError(f"Invalid Comma Pattern for {val}")
+        segments = ['']
+        slots = []
+        values = {}
 
-        self.replacement_dict = replacement_dict
+        for kind, value in tokens:
+            if kind in (LITERAL, MACRO):
+                segments[-1] += value
+                continue
 
-    def calculate_coverpoints(self, instr, replacement_dict, place_holder_pattern):
+            # Bind the dependent placeholders to their source brace
+            slot = place_holder_pattern[value - 1] if kind == NUMBER else value[0]
+
+            if slot not in values:
+                values[slot] = self.text_values(replacement_dict[slot])
+            slots.append(slot)
+            segments.append('')
+
+        return segments, slots, values
+
+    def text_values(self, values):
         """
-        Calculate coverpoints based on the provided instructions, replacement dictionary, and placeholder pattern.
+        Convert the resolved values of a slot to the strings written into the coverpoints.
 
         Args:
-            instr (str): The instruction string.
+            values (list, range or LazyRange): The resolved values.
+
+        Returns:
+            list or LazyRange: The values as strings, wide ranges are converted lazily when indexed.
+        """
+        if len(values) > LAZY_MIN_SIZE:
+            if isinstance(values, LazyRange):
+                return values.as_text()
+            if isinstance(values, range):
+                return LazyRange(values, text=True)
+        return [str(val) for val in values]
+
+    def calculate_coverpoints(self, plan, replacement_dict):
+        """
+        Calculate coverpoints based on the provided expansion plan and replacement dictionary.
+
+        The number of coverpoints is computed from the slot sizes and checked against
+        max_coverpoints before anything is generated.
+
+        Args:
+            plan (tuple): The expansion plan returned by compile_plan.
             replacement_dict (dict): A dictionary containing keys with placeholders and their corresponding values.
-            place_holder_pattern (list): A list containing the modified order of placeholders.
 
         Returns:
             None
+
+        Raises:
+            ValueError: If the line expands to more than max_coverpoints and on_limit is 'error'.
         """
         # Create a Track Dictionary of the current variables
         track_dict = {}
         # Populate the dictionary with the proper indexes
         track_dict = self.initialize_track_dict(track_dict, replacement_dict) 
-        # Initialize max_len
-        max_len= 0
-        # Check if replacement_dict is not empty
-        if replacement_dict:
-            # Find the maximum length and key where the value is a list
-            max_list_values = [(len(val)) for val in replacement_dict.values() if isinstance(val, list)]
-            if max_list_values:
-                max_len = max(max_list_values)
-            else:
-                #In Case, there is no list but we have coverpoints
-                max_len = 1
 
-        # Now max_len and max_key will contain the maximum length and corresponding key
+        count = self.expansion_count({key: val[1] for key, val in track_dict.items()})
+        if self.expansion_mode == 'product':
+            tracks = self.product_tracks(track_dict, self.expansion_dimensions(track_dict)) if track_dict else ()
+        else:
+            tracks = self.lockstep_tracks(track_dict, count)
 
-        gen_cov_list = []
+        self.check_limit(count)
 
-        for _ in range(max_len):
-            
+        curr_cov, label = self.curr_cov, self.label
+        for track in tracks:
             # Generate coverpoint for current track
-            out_cov = self.generate_current_cov(instr, track_dict, replacement_dict, place_holder_pattern)
+            out_cov = self.generate_current_cov(plan, track)
+            self.generator(curr_cov, label, f"{out_cov}", 1)
+
+    def expansion_count(self, sizes):
+        """
+        Compute the number of coverpoints of a line from the number of values of its slots.
+
+        Args:
+            sizes (dict): A dictionary containing the slots and their number of values.
+
+        Returns:
+            int: The length of the longest slot when every brace advances together, the product of the
+                independent loops in product mode, or 0 if the line has no slots.
+        """
+        if not sizes:
+            return 0
+        if self.expansion_mode == 'product':
+            return math.prod(sizes[keys[0]] for keys in self.expansion_dimensions(sizes))
+        return max(sizes.values())
+
+    def lockstep_tracks(self, track_dict, max_len):
+        """
+        Advance every brace together, wrapping the shorter ones around.
+
+        Args:
+            track_dict (dict): A dictionary containing the current track of variables.
+            max_len (int): Number of coverpoints to generate.
 
+        Yields:
+            dict: The track dictionary for every coverpoint.
+        """
+        for _ in range(max_len):
+            yield track_dict
             # Update the state of the track_dict
             track_dict = self.update_replacement_dict(track_dict)
 
-            gen_cov_list.append(out_cov)
+    def expansion_dimensions(self, track_dict):
+        """
+        Group the tracked placeholders into the independent loops of the product expansion.
+
+        The internal brace of a multibrace advances with its multibrace, every other placeholder is a loop of its own.
 
-        for coverpoint in gen_cov_list:
-            self.generator(self.curr_cov, self.label, f"{coverpoint}", 1)
+        Args:
+            track_dict (dict): A dictionary keyed by the slots of the line.
+
+        Returns:
+            list: A list of placeholder lists, the first placeholder of each one sets the loop length.
+        """
+        dimensions = {}
+        for key in track_dict:
+            kind, index = key
+            owner = (MULTI, index) if kind == INNER else key
+            dimensions.setdefault(owner, [])
+            if key == owner:
+                dimensions[owner].insert(0, key)
+            else:
+                dimensions[owner].append(key)
+        return list(dimensions.values())
 
-    def generate_current_cov(self, instr, track_dict, replacement_dict, place_holder_pattern):
+    def product_tracks(self, track_dict, dimensions):
         """
-        Generate coverpoints for the current instruction based on the track dictionary, replacement dictionary,
-        and placeholder pattern.
+        Iterate lazily over every combination of the independent loops, the last one varying fastest.
 
         Args:
-            instr (str): The instruction string.
             track_dict (dict): A dictionary containing the current track of variables.
-            replacement_dict (dict): A dictionary containing keys with placeholders and their corresponding values.
-            place_holder_pattern (list): A list containing the modified order of placeholders.
+            dimensions (list): The loops returned by expansion_dimensions.
+
+        Yields:
+            dict: The track dictionary for every coverpoint.
+        """
+        if not dimensions:
+            yield track_dict
+            return
+
+        loops = [range(track_dict[keys[0]][1]) for keys in dimensions]
+        for indexes in itertools.product(*loops):
+            for keys, index in zip(dimensions, indexes):
+                for key in keys:
+                    track_dict[key][2] = index % track_dict[key][1]
+            yield track_dict
+
+    def check_limit(self, count):
+        """
+        Check the number of coverpoints of the current line against max_coverpoints.
+
+        Args:
+            count (int): Number of coverpoints the line expands to.
+
+        Raises:
+            ValueError: If the limit is exceeded and on_limit is 'error'.
+        """
+        if self.max_coverpoints is None or count <= self.max_coverpoints:
+            return
+        message = (f"Label {self.label} of {self.curr_cov} expands to {count} coverpoints, "
+                   f"above the limit of {self.max_coverpoints}")
+        if self.on_limit == 'error':
+            raise ValueError(f"{message}.")
+        print(f"Warning: {message}.")
+
+    def generate_current_cov(self, plan, track_dict):
+        """
+        Generate coverpoints for the current instruction based on the expansion plan and the track dictionary.
+
+        Args:
+            plan (tuple): The expansion plan returned by compile_plan.
+            track_dict (dict): A dictionary containing the current track of variables.
 
         Returns:
             str: The generated coverpoint.
         """
-        number_pattern = re.compile('\d+')
+        segments, slots, values = plan
+        if not slots:
+            return segments[0]
 
-        for key, val in replacement_dict.items():
-            
-            #Resolve the MULTI_BRACES back
-            if "MULTI" in key and "MULTI_INTER" not in key:
-                curr_index = track_dict[key][2]
-                instr = instr.replace(key, str(val[curr_index]))
-
-            #Resolve the Single braces back
-            if "SINGLE" in key:
-                curr_index = track_dict[key][2]
-                instr = instr.replace(key, str(val[curr_index]))
-
-            # Resolve the Comma Seperated back
-            if "COMMA" in key:
-                curr_index = track_dict[key][2]
-                instr = instr.replace(key, str(val[curr_index]))
-
-            #Resolve the dependent placeholders
-            if "NUMBER" in key:
-                result = number_pattern.findall(val)
-                result = int(result[0]) -1
-                var = place_holder_pattern[result]
-                curr_index = track_dict[var][2]
-                instr = instr.replace(key, str(replacement_dict[var][curr_index]))
-
-        # Resolve back the macros
-        for key, val in replacement_dict.items():
-            if "MACRO" in key:
-                instr = instr.replace(key, val)
+        parts = [segments[0]]
+        for key, literal in zip(slots, segments[1:]):
+            parts.append(values[key][track_dict[key][2]])
+            parts.append(literal)
 
-        return instr
+        return ''.join(parts)
 
     def generator(self, curr_cov, label, line, rule):
         """
@@ -475,66 +2483,243 @@ class Translator:
         Returns:
             None
         """
+        context = self.context
         if rule == 0:
-            self.data_yaml[curr_cov][label] = line
+            if context.store is not None:
+                context.store.set_value(curr_cov, label, line)
+            else:
+                context.data_yaml[curr_cov][label] = line
         elif rule == 1:
-            if label in self.data_yaml[curr_cov]:
-                self.data_yaml[curr_cov][label][line] = 0
+            if self.fold_constants:
+                line = self.fold(line)
+            if context.store is not None:
+                context.store.add(curr_cov, label, line)
+            elif label in context.data_yaml[curr_cov]:
+                context.data_yaml[curr_cov][label][line] = 0
             else:
-                self.data_yaml[curr_cov][label] = {}
-                self.data_yaml[curr_cov][label][line] = 0
+                context.data_yaml[curr_cov][label] = {}
+                context.data_yaml[curr_cov][label][line] = 0
+
+
+
+    def fold(self, line):
+        """
+        Evaluate the integer-only subexpressions of a coverpoint into literals.
+
+        The coverpoint is parsed as the Python expression ISAC evaluates, everything that is not a maximal
+        subexpression of integer literals and known macros is copied as written. Names of CSRs and registers,
+        function calls such as old(...), strings, '/' and '**' are never folded. Lines that are not valid
+        Python expressions are returned unchanged.
+
+        Args:
+            line (str): The coverpoint, e.g. (pmpcfgmsk<<2<<3) & (0xFF<<8).
+
+        Returns:
+            str: The folded coverpoint, e.g. (pmpcfgmsk<<2<<3) & (0xff00).
+        """
+        parsed = self.parse_coverpoint(line)
+        if parsed is None:
+            return line
+        tree, text, placeholders = parsed
+
+        # Offsets reported by ast are in UTF-8 bytes of the stripped text
+        source = text.strip().encode('utf-8')
+        macros = {name: self.macros.get(match.group(1).strip()) for name, match in placeholders.items()}
+        spans = []
+        value = self.fold_node(tree.body, source, macros, spans)
+        if value is not None and not isinstance(tree.body, ast.Constant):
+            spans = [(tree.body.col_offset, tree.body.end_col_offset, value)]
+        if not spans:
+            return line
+
+        # A subexpression with a hexadecimal literal is folded into a hexadecimal literal
+        parts, position = [], 0
+        for start, end, (value, hexadecimal) in spans:
+            parts.append(source[position:start])
+            parts.append((hex(value) if hexadecimal else str(value)).encode('utf-8'))
+            position = end
+        parts.append(source[position:])
+        lead = text[:len(text) - len(text.lstrip())]
+        trail = text[len(text.rstrip()):]
+        folded = lead + b''.join(parts).decode('utf-8') + trail
+        for name, match in placeholders.items():
+            folded = folded.replace(name, match.group(0))
+        return folded
+
+    def canonical_coverpoint(self, line):
+        """
+        Return the canonical form of a coverpoint, equal for coverpoints that differ only by whitespace,
+        redundant parentheses or the spelling of their literals.
+
+        Args:
+            line (str): The coverpoint.
+
+        Returns:
+            str: The dump of the expression tree, or the coverpoint with its whitespace collapsed if it is
+                not a valid Python expression.
+        """
+        parsed = self.parse_coverpoint(line)
+        if parsed is None:
+            return ' '.join(line.split())
+        tree, _, placeholders = parsed
+        canonical = ast.dump(tree.body)
+        for name, match in placeholders.items():
+            canonical = canonical.replace(name, match.group(0))
+        return canonical
+
+    def parse_coverpoint(self, line):
+        """
+        Parse a coverpoint as the Python expression ISAC evaluates.
+
+        ${variable} is not Python, every macro is parsed as a name __macro<n>__ to be written back afterwards.
+
+        Args:
+            line (str): The coverpoint.
+
+        Returns:
+            tuple: A tuple (tree, text, placeholders) with the expression tree of the stripped text, the text
+                with the macros replaced and the macro matches by placeholder name, or None if the
+                coverpoint is not a valid single line expression.
+        """
+        placeholders = {}
+        def placeholder(match):
+            name = f"__macro{len(placeholders)}__"
+            placeholders[name] = match
+            return name
+        text = self.macro_finder.sub(placeholder, line)
+        if '\n' in text:
+            return None
+        try:
+            tree = ast.parse(text.strip(), mode='eval')
+        except (SyntaxError, ValueError):
+            return None
+        return tree, text, placeholders
+
+    def fold_node(self, node, source, macros, spans):
+        """
+        Fold an expression node, recording the maximal constant subexpressions below a node that is not constant.
 
+        Args:
+            node (ast.AST): The expression node.
+            source (bytes): The parsed text, the node offsets index into it.
+            macros (dict): The values of the macro placeholders, None for the macros without a value.
+            spans (list): List of (start, end, value) tuples the replacements are appended to, in order.
 
+        Returns:
+            tuple: A tuple (value, hexadecimal) if the node is constant, otherwise None.
+        """
+        if isinstance(node, ast.Constant):
+            if type(node.value) is not int:
+                return None
+            return node.value, source[node.col_offset:node.end_col_offset].lower().startswith(b'0x')
+        if isinstance(node, ast.Name):
+            value = macros.get(node.id)
+            return None if value is None else (value, False)
+        if isinstance(node, ast.Call):
+            return None
+
+        if isinstance(node, ast.BinOp):
+            operands = [node.left, node.right]
+            function = FOLD_OPERATIONS.get(type(node.op))
+        elif isinstance(node, ast.UnaryOp):
+            operands = [node.operand]
+            function = FOLD_UNARY_OPERATIONS.get(type(node.op))
+        else:
+            operands = [child for child in ast.iter_child_nodes(node) if isinstance(child, ast.expr)]
+            function = None
+
+        values = [self.fold_node(operand, source, macros, spans) for operand in operands]
+        if function is not None and all(values):
+            value = None
+            # Shifts are bounded so that a huge shift count does not exhaust memory
+            if not (isinstance(node.op, ast.LShift) and values[1][0] > 256):
+                try:
+                    value = function(*(val[0] for val in values))
+                except (ValueError, ZeroDivisionError):
+                    pass
+            if value is not None and abs(value) < FOLD_LIMIT:
+                return value, any(val[1] for val in values)
+
+        for operand, value in zip(operands, values):
+            if value is not None and not isinstance(operand, ast.Constant):
+                spans.append((operand.col_offset, operand.end_col_offset, value))
+        return None
 
     """Helper Functions"""
-    def replace_using_dict(self, instr, replace_dict):
+    def count_coverpoints(self, data_yaml):
         """
-        Replace substrings in the instruction string based on the provided dictionary.
+        Count the generated coverpoints in the translated data.
 
         Args:
-            instr (str): The instruction string to perform replacements on.
-            replace_dict (dict): A dictionary containing substrings to replace as keys and their replacements as values.
+            data_yaml (dict): The translated data.
 
         Returns:
-            tuple: A tuple containing the modified instruction string and a dictionary of replacements made.
+            int: The number of coverpoints in every label holding coverpoints.
         """
-        if not replace_dict:
-            return instr, {}
-        
-        replacements = {}
-        def replace(match):
-            replacement = replace_dict[match.group(0)]
-            replacements[replacement] = match.group(0)
-            return replacement
-        instr = re.sub('|'.join(map(re.escape, replace_dict.keys())), replace, instr)
-        return instr, replacements
+        return sum(len(value) for group in data_yaml.values() if isinstance(group, dict)
+                   for value in group.values() if isinstance(value, dict))
 
-    def replace_order_pattern(self, instr):
+    def sorted_keys(self, mapping):
         """
-        Modify the order of placeholders in the instruction string based on the order of appearance.
+        Return the keys of a mapping in the order yaml.dump emits them.
 
         Args:
-            instr (str): The instruction string containing placeholders.
+            mapping (dict): The mapping whose keys are ordered.
 
         Returns:
-            list: A list containing the modified order of placeholders.
+            list: The sorted keys, or the insertion order if the keys are not comparable.
         """
-        placeholders = self.placeholder_pattern.findall(instr)
-        sorted_placeholders = sorted(placeholders, key=lambda x: instr.index(x))
-        
-        # Create a new list to store the modified order of placeholders
-        modified_placeholders = []
+        try:
+            return sorted(mapping)
+        except TypeError:
+            return list(mapping)
+
+    def emit_data(self, dumper, data):
+        """
+        Represent a Python object and emit its YAML events through the given dumper.
+
+        Args:
+            dumper (yaml.SafeDumper): The dumper whose stream is being written.
+            data (object): The object to emit.
 
-        for val in sorted_placeholders:
-            if "MULTI" in val:
-                digit_match = re.search(r'\d+', val)
-                if digit_match:
-                    digit = digit_match.group(0)
-                    modified_placeholders.append(f'<<MULTI_INTER{digit}>>')
+        Returns:
+            None
+        """
+        node = dumper.represent_data(data)
+        dumper.represented_objects = {}
+        dumper.object_keeper = []
+        dumper.alias_key = None
+        self.emit_node(dumper, node)
+
+    def emit_node(self, dumper, node):
+        """
+        Emit the YAML events of a representation node, mirroring yaml.Serializer without anchors.
 
-            modified_placeholders.append(val)
+        Args:
+            dumper (yaml.SafeDumper): The dumper whose stream is being written.
+            node (yaml.Node): The node to emit.
 
-        return (modified_placeholders)
+        Returns:
+            None
+        """
+        if isinstance(node, yaml.ScalarNode):
+            detected_tag = dumper.resolve(yaml.ScalarNode, node.value, (True, False))
+            default_tag = dumper.resolve(yaml.ScalarNode, node.value, (False, True))
+            implicit = (node.tag == detected_tag), (node.tag == default_tag)
+            dumper.emit(yaml.ScalarEvent(None, node.tag, implicit, node.value, style=node.style))
+        elif isinstance(node, yaml.SequenceNode):
+            implicit = node.tag == dumper.resolve(yaml.SequenceNode, node.value, True)
+            dumper.emit(yaml.SequenceStartEvent(None, node.tag, implicit, flow_style=node.flow_style))
+            for item in node.value:
+                self.emit_node(dumper, item)
+            dumper.emit(yaml.SequenceEndEvent())
+        elif isinstance(node, yaml.MappingNode):
+            implicit = node.tag == dumper.resolve(yaml.MappingNode, node.value, True)
+            dumper.emit(yaml.MappingStartEvent(None, node.tag, implicit, flow_style=node.flow_style))
+            for key, value in node.value:
+                self.emit_node(dumper, key)
+                self.emit_node(dumper, value)
+            dumper.emit(yaml.MappingEndEvent())
 
     def initialize_track_dict(self, track_dict, replacement_dict):
         """
@@ -548,7 +2733,7 @@ class Translator:
             dict: The initialized track dictionary.
         """
         for key, val in replacement_dict.items():
-            if isinstance(val, list):
+            if isinstance(val, (list, range, LazyRange)):
                 start_index, end_index, curr_index = 0, len(val), 0
                 track_dict[key] = [start_index, end_index, curr_index]                
 
@@ -574,35 +2759,315 @@ class Translator:
 
     def apply_operation(self, range_list, operation, digit):
         """
-        Applies the specified operation to each element in the range list.
+        Applies the specified operation to every element in the range list.
 
         Args:
-            range_list (list): The list of numbers to apply the operation to.
-            operation (str): The operation to apply (e.g., '+', '-', '*', '/', '<<', '>>').
+            range_list (range or list): The numbers to apply the operation to.
+            operation (str): The operation to apply, one of the keys of OPERATIONS.
             digit (int): The operand to use in the operation.
 
         Returns:
-            list: The list of numbers after applying the operation and floor function to each element.
+            list: The list of numbers after applying the operation, with divisions floored.
 
         Raises:
             ValueError: If the operation is invalid.
         """
+        function = OPERATIONS.get(operation)
+        if function is None:
+            raise ValueError(f"Invalid operation {operation}.")
+        digit = int(digit)
+        return [function(val, digit) for val in range_list]
+
+
+"""Process pool workers"""
+worker_translator = None
+
+def init_worker(translator):
+    """Store the translator copy used by the current worker process."""
+    global worker_translator
+    # Duplicates are looked up across the whole document by the parent process
+    translator.dedupe = None
+    worker_translator = translator
+
+def translate_group(task):
+    """
+    Expand a single coverage group in a worker process.
+
+    Args:
+        task (tuple): A tuple (curr_cov, group) with the group name and its defs data.
+
+    Returns:
+        dict: The expanded labels of the group.
+    """
+    curr_cov, group = task
+    worker_translator.defs_data = {curr_cov: group}
+    worker_translator.evaluate_cp()
+    return worker_translator.data_yaml[curr_cov]
+
+
+def expand_inputs(patterns):
+    """
+    Expand the input arguments of the command line into a list of defs files.
+
+    Args:
+        patterns (list): File paths or glob patterns. An entry starting with @ names a manifest
+            file listing one path or pattern per line, relative to the manifest.
+
+    Returns:
+        list: The defs files, in argument order, without duplicates.
+    """
+    paths = []
+    for pattern in patterns:
+        if pattern.startswith('@'):
+            manifest = pattern[1:]
+            with open(manifest, 'r') as file:
+                entries = [line.strip() for line in file]
+            base_dir = os.path.dirname(manifest)
+            entries = [os.path.join(base_dir, entry) for entry in entries if entry and not entry.startswith('#')]
+            paths.extend(expand_inputs(entries))
+            continue
+        matches = sorted(glob.glob(pattern, recursive=True))
+        # Keep unmatched names so that the missing file is reported
+        paths.extend(matches if matches else [pattern])
+    return list(dict.fromkeys(paths))
+
+
+def load_macros(macros_path):
+    """
+    Load the macro table used to fold ${variable} macros.
+
+    Args:
+        macros_path (str): Path to a YAML file mapping macro names to integer values.
+
+    Raises:
+        ValueError: If the file does not contain a mapping.
+
+    Returns:
+        dict: The macro values, by macro name.
+    """
+    with open(macros_path, 'r') as file:
+        macros = yaml.safe_load(file)
+    if not isinstance(macros, dict):
+        raise ValueError(f"{macros_path} does not map macro names to values.")
+    return macros
+
+
+def print_duplicates(input_path, dedupe_index):
+    """
+    Print the duplicate statistics of a translated defs file.
+
+    Args:
+        input_path (str): Path to the defs file.
+        dedupe_index (DedupIndex): The index the translation was deduplicated with.
+
+    Returns:
+        dict: The statistics and every duplicate with the group, label and position of its first occurrence,
+            for the JSON report.
+    """
+    stats = dedupe_index.stats()
+    print(f"{input_path}: {stats['duplicates']} duplicates in {stats['coverpoints']} coverpoints, "
+          f"{stats['removed']} removed")
+    return {
+        'stats': stats,
+        'duplicates': [{'group': dup[0], 'label': dup[1], 'coverpoint': dup[2],
+                        'first_group': first[0], 'first_label': first[1], 'first_position': first[2]}
+                       for dup, first in dedupe_index.duplicates],
+    }
+
+
+def print_counts(input_path, counts):
+    """
+    Print the number of coverpoints of every label of a defs file.
+
+    Args:
+        input_path (str): Path to the defs file.
+        counts (dict): The counts returned by Translator.count.
+
+    Returns:
+        int: The total number of coverpoints.
+    """
+    total = 0
+    print(f"{input_path}:")
+    for curr_cov, labels in counts.items():
+        for label, count in labels.items():
+            print(f"  {curr_cov:<40} {label:<24} {count:>12}")
+            total += count
+    print(f"  {'total':<65} {total:>12}")
+    return total
+
+
+def add_translator_arguments(parser):
+    """
+    Add the options that configure a Translator, shared by every command line.
+
+    Args:
+        parser (argparse.ArgumentParser): The parser to add the options to.
+    """
+    parser.add_argument('--yaml-backend', choices=('auto', 'c', 'python'), default='auto',
+                        help="YAML implementation used to load the files.")
+    parser.add_argument('--dump-backend', choices=('python', 'c'), default='python',
+                        help="YAML implementation used to write the CGF files, libyaml is faster but may fold "
+                             "keys longer than 128 characters differently.")
+    parser.add_argument('--expansion', choices=('lockstep', 'product'), default='lockstep',
+                        help="Advance the braces of a line together or expand them like nested loops.")
+    parser.add_argument('--max-coverpoints', type=int,
+                        help="Maximum number of coverpoints a single line may expand to.")
+    parser.add_argument('--on-limit', choices=('error', 'warn'), default='error',
+                        help="Fail or only warn when a line exceeds --max-coverpoints.")
+    parser.add_argument('--fold-constants', action='store_true',
+                        help="Evaluate the integer-only subexpressions of the generated coverpoints into literals.")
+    parser.add_argument('--macros',
+                        help="YAML file mapping macro names to integer values folded by --fold-constants.")
+    parser.add_argument('--dedupe', choices=('report', 'drop'),
+                        help="Look for coverpoints repeated across labels and groups, up to whitespace and "
+                             "redundant parentheses, and report or drop them.")
+    parser.add_argument('--fragment-cache-size', type=int, default=1024,
+                        help="Number of parsed braces kept for the following lines, 0 disables the cache.")
+    parser.add_argument('--compact', action='store_true',
+                        help="Keep the expanded coverpoints in a compact store until they are written.")
+    parser.add_argument('--cache-dir',
+                        help="Directory of the incremental rebuild cache, only changed groups are expanded again.")
+    parser.add_argument('--cache-size', type=int, default=256,
+                        help="Maximum size of the rebuild cache in MiB.")
+
+
+def translator_from_args(args):
+    """
+    Build a Translator from the options added by add_translator_arguments.
+
+    Args:
+        args (argparse.Namespace): The parsed command line.
+
+    Returns:
+        Translator: The configured translator.
+    """
+    cache = ExpansionCache(args.cache_dir, args.cache_size * 1024 * 1024) if args.cache_dir else None
+    macros = load_macros(args.macros) if args.macros else None
+    return Translator(args.yaml_backend, cache, args.expansion, args.max_coverpoints, args.on_limit,
+                      args.fold_constants, macros, args.dedupe, args.fragment_cache_size, args.compact,
+                      args.dump_backend)
+
+
+def main(argv=None):
+    """Command line entry point."""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Translate defs files into CGF files.")
+    parser.add_argument('inputs', nargs='*',
+                        help="Defs files or glob patterns, @FILE reads a manifest with one entry per line. "
+                             "Defaults to config.defs next to this script.")
+    parser.add_argument('-o', '--output',
+                        help="Path to save the CGF file of a single input. Defaults to output.cgf next to this script.")
+    parser.add_argument('-d', '--output-dir',
+                        help="Directory where <name>.cgf is written for every input.")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="Number of worker processes used to expand the coverage groups.")
+    parser.add_argument('--count', action='store_true',
+                        help="Only report the number of coverpoints of every label, nothing is written.")
+    parser.add_argument('--shards', type=int,
+                        help="Split every CGF file into this many files balanced by coverpoint count, "
+                             "with a manifest of the groups and labels of every shard.")
+    parser.add_argument('--shard-level', choices=('group', 'label'), default='group',
+                        help="Keep every coverage group in a single shard or distribute its labels.")
+    parser.add_argument('--stream', action='store_true',
+                        help="Write the CGF one coverage group and label at a time.")
+    parser.add_argument('--stream-input', action='store_true',
+                        help="Parse the defs one coverage group at a time and write each group as soon as it is "
+                             "expanded, in the order of the input.")
+    parser.add_argument('--group', action='append', dest='groups',
+                        help="Expand only the coverage groups matching this glob, or regular expression after re:. "
+                             "May be repeated.")
+    parser.add_argument('--label', action='append', dest='labels',
+                        help="Expand only the labels matching this glob, or regular expression after re:. May be repeated.")
+    parser.add_argument('--unselected', choices=('skip', 'passthrough'), default='skip',
+                        help="Leave out the groups and labels that are not selected or copy them unexpanded.")
+    parser.add_argument('--patch', action='store_true',
+                        help="Replace the selected groups and labels in the existing output file instead of overwriting it.")
+    add_translator_arguments(parser)
+    parser.add_argument('--dedupe-report',
+                        help="Path to save a JSON report of the duplicates found by --dedupe.")
+    parser.add_argument('--profile',
+                        help="Path to save a JSON report of the time spent in every phase, label and key.")
+    parser.add_argument('--profile-stats',
+                        help="Path to save cProfile statistics of the translation.")
+    parser.add_argument('--plan-dir',
+                        help="Directory of the precompiled <name>.plan artifacts of the inputs, rebuilt when their "
+                             "input or the translator changes.")
+    args = parser.parse_args(argv)
+
+    inputs = expand_inputs(args.inputs) if args.inputs else [os.path.join(script_dir, 'config.defs')]
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+        outputs = [os.path.join(args.output_dir, os.path.splitext(os.path.basename(path))[0] + '.cgf')
+                   for path in inputs]
+        if len(set(outputs)) != len(outputs):
+            parser.error("Several inputs map to the same file in the output directory.")
+    elif len(inputs) == 1:
+        outputs = [args.output or os.path.join(script_dir, 'output.cgf')]
+    else:
+        parser.error("--output-dir is required when translating several files.")
+    if args.plan_dir:
+        if args.stream_input:
+            parser.error("--stream-input parses the defs as they are expanded, it cannot use --plan-dir.")
+        os.makedirs(args.plan_dir, exist_ok=True)
+        plans = [os.path.join(args.plan_dir, os.path.splitext(os.path.basename(path))[0] + '.plan')
+                 for path in inputs]
+        if len(set(plans)) != len(plans):
+            parser.error("Several inputs map to the same file in the plan directory.")
+    else:
+        plans = [None] * len(inputs)
+
+    # A single translator is reused so that every file shares the compiled patterns
+    trans = translator_from_args(args)
+    if args.profile or args.profile_stats:
+        trans.enable_profiling(cprofile=bool(args.profile_stats))
+    selector = Selector(args.groups, args.labels) if args.groups or args.labels else None
+    report = []
+    duplicates = {}
+    for input_path, output_path, plan_path in zip(inputs, outputs, plans):
+        start = time.perf_counter()
         try:
-            result_list = [eval(f"x {operation} {digit}") for x in range_list]
-            # Applying the floor operation to each element in the result list
-            result_list_floor = [math.floor(num) for num in result_list]
-            return result_list_floor
-        except SyntaxError:
-            raise ValueError("Invalid operation.")
-
-
-
-
-
+            if args.count:
+                count = print_counts(input_path, trans.count(input_path, plan_path, selector))
+            else:
+                context = TranslationContext()
+                count = trans.translate(input_path, output_path, stream=args.stream, jobs=args.jobs,
+                                        shards=args.shards, shard_level=args.shard_level,
+                                        stream_input=args.stream_input, selector=selector,
+                                        unselected=args.unselected, patch=args.patch, plan_path=plan_path,
+                                        context=context)
+                if args.dedupe:
+                    duplicates[input_path] = print_duplicates(input_path, context.dedupe_index)
+            error = None
+        except Exception as e:
+            count, error = 0, e
+        report.append((input_path, output_path, count, time.perf_counter() - start, error))
+
+    if args.dedupe_report:
+        with open(args.dedupe_report, 'w') as file:
+            json.dump(duplicates, file, indent=2)
+    if args.profile:
+        trans.profiler.dump_json(args.profile)
+    if args.profile_stats:
+        trans.profiler.dump_stats(args.profile_stats)
+
+    if args.output_dir or len(report) > 1:
+        print(f"{'input':<40} {'coverpoints':>12} {'seconds':>9}")
+        for input_path, output_path, count, elapsed, error in report:
+            status = f"  FAILED: {error}" if error else ""
+            print(f"{input_path:<40} {count:>12} {elapsed:>9.3f}{status}")
+        print(f"{'total':<40} {sum(row[2] for row in report):>12} {sum(row[3] for row in report):>9.3f}")
+    elif report[0][4]:
+        raise report[0][4]
+
+    if (args.profile or args.profile_stats) and trans.fragment_cache is not None:
+        stats = trans.fragment_cache.stats()
+        print(f"fragments: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries")
+    if trans.cache is not None:
+        stats = trans.cache.stats()
+        print(f"cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries, {stats['size']} bytes")
+
+    return 1 if any(row[4] for row in report) else 0
 
 
 if __name__ == "__main__":
-    defs_path = '/home/hammad/wrapper_cgf/Wrapper-cgf/config.defs'
-    cgf_path  = '/home/hammad/wrapper_cgf/Wrapper-cgf/output.cgf'
-    trans = Translator()
-    trans.translate(defs_path, cgf_path)
+    sys.exit(main())
\ No newline at end of file